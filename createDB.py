@@ -1,363 +1,358 @@
 from sqlalchemy import create_engine
 import pandas as pd
-import os
-from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import text
 
+from repository import BUSY_TIMEOUT
+from maintenance import analyze
+from rollups import refresh_rollups
+
+# Schema helpers live in `schema` so `resto init` does not import pandas
+from schema import (
+    apply_sql_script,
+    database_exists,
+    database_path_from_url,
+    initialize_database,
+)
+from validation import to_reject_records, validate, write_reject_file
+
+__all__ = [
+    # Re-exported from `schema` for scripts that still import them from here
+    "apply_sql_script",
+    "database_exists",
+    "initialize_database",
+    "get_restaurant_id",
+    "get_restaurant_ids",
+    "get_client_ids",
+    "load_table",
+    "populate_database",
+    "create_database_engine",
+    "load_sheets",
+    "load_frames",
+    "finish_load",
+    "main",
+]
 
-def database_exists(database_url: str) -> bool:
+
+def get_restaurant_id(engine, restaurant_name):
     """
-    Check if the database file exists.
+    Get the restaurant_id from the `restaurant` table based on the restaurant name.
 
-    :param database_url: SQLite database URL.
-    :return: True if the database file exists, False otherwise.
+    :param engine: SQLAlchemy engine.
+    :param restaurant_name: Name of the restaurant.
+    :return: The corresponding restaurant_id.
     """
-    if database_url.startswith("sqlite:///"):
-        db_file = database_url.replace("sqlite:///", "")
-        return os.path.exists(db_file)
-    return False
+    query = text("SELECT restaurant_id FROM restaurant WHERE name=:name")
+    with engine.connect() as conn:
+        result = conn.execute(query, {"name": restaurant_name}).fetchone()
+    return result[0] if result else None
 
 
-def apply_sql_script(database_url: str, script_path: str):
+def get_restaurant_ids(engine) -> dict:
     """
-    Applies an SQL script to initialize the database.
+    Get the mapping of restaurant name to restaurant_id in a single query.
 
-    :param database_url: SQLite database URL.
-    :param script_path: Path to the SQL script to execute.
+    :param engine: SQLAlchemy engine.
+    :return: Dictionary of restaurant name to restaurant_id.
+    """
+    with engine.connect() as conn:
+        result = conn.execute(text("SELECT name, restaurant_id FROM restaurant"))
+        return dict(result.fetchall())
+
+
+def get_client_ids(engine) -> dict:
     """
-    engine = create_engine(database_url)
+    Get the mapping of client email to client_id in a single query.
 
+    :param engine: SQLAlchemy engine.
+    :return: Dictionary of client email to client_id.
+    """
+    with engine.connect() as conn:
+        result = conn.execute(text("SELECT email, client_id FROM client"))
+        return dict(result.fetchall())
+
+
+def load_table(engine, df, table, sheet_name, rejects, foreign_keys=None):
+    """
+    Validate a DataFrame and append its valid rows to a table.
+
+    Invalid rows are collected in `rejects` with their reasons instead of
+    failing the whole batch, so the remaining rows and sheets still load.
+
+    :param engine: SQLAlchemy engine.
+    :param df: DataFrame whose columns are already renamed to the schema names.
+    :param table: Name of the target table.
+    :param sheet_name: Name of the source sheet (reported in the reject file).
+    :param rejects: List collecting the rejected rows of the run.
+    :param foreign_keys: Mapping of foreign key column to the ids it may reference.
+    """
     try:
-        with open(script_path, "r") as file:
-            sql_script = file.read()
+        valid, rejected = validate(df, table, foreign_keys)
+    except ValueError as e:
+        print(f"Missing columns in sheet '{sheet_name}': {e}")
+        rejects.append(to_reject_records(df.assign(reason=str(e)), table, sheet_name))
+        return
+
+    if not rejected.empty:
+        print(f"Rejected {len(rejected)} rows from sheet '{sheet_name}'.")
+
+    if not valid.empty:
+        try:
+            valid.to_sql(table, con=engine, if_exists="append", index=False)
+            print(
+                f"Successfully populated `{table}` table with {len(valid)} rows from sheet '{sheet_name}'."
+            )
+        except Exception as e:
+            print(f"An error occurred while populating `{table}` from sheet '{sheet_name}': {e}")
+            rejected = pd.concat([rejected, df.loc[valid.index].assign(reason=str(e))])
 
-        with engine.connect() as connection:
-            connection.connection.executescript(sql_script)
+    rejects.append(to_reject_records(rejected, table, sheet_name))
 
-        print("Applied SQL script successfully.")
+
+def populate_database(
+    database_url: str, excel_file_path: str, reject_file_path: str = "rejects.csv"
+):
+    """
+    Populate the database from the Excel workbook.
+
+    :param database_url: SQLite database URL.
+    :param excel_file_path: Path to the Excel workbook.
+    :param reject_file_path: Path of the CSV file receiving the rejected rows.
+    """
+    try:
+        data = pd.read_excel(excel_file_path, sheet_name=None)  # Load all sheets
     except Exception as e:
-        print(f"An error occurred while applying the SQL script: {e}")
+        print(f"An error occurred while reading '{excel_file_path}': {e}")
+        return
 
+    load_sheets(database_url, data, reject_file_path)
 
-def initialize_database(database_url: str, up_script_path: str):
+
+def create_database_engine(database_url: str):
     """
-    Initialize the database using the provided SQL script.
+    Create the SQLAlchemy engine used to load data.
 
     :param database_url: SQLite database URL.
-    :param up_script_path: Path to the SQL schema script.
+    :return: SQLAlchemy engine.
     """
-    if not database_exists(database_url):
-        print("Database does not exist. Creating database and applying schema...")
-        apply_sql_script(database_url, up_script_path)
-    else:
-        print("Database already exists. Skipping schema creation.")
+    # Wait for concurrent writers instead of failing with "database is locked"
+    return create_engine(database_url, connect_args={"timeout": BUSY_TIMEOUT})
 
 
-def get_restaurant_id(engine, restaurant_name):
+def load_sheets(database_url: str, data: dict, reject_file_path: str = "rejects.csv"):
     """
-    Get the restaurant_id from the `restaurant` table based on the restaurant name.
+    Validate and load every sheet of the workbook layout into the database.
 
-    :param engine: SQLAlchemy engine.
-    :param restaurant_name: Name of the restaurant.
-    :return: The corresponding restaurant_id.
+    :param database_url: SQLite database URL.
+    :param data: Dictionary of sheet name to DataFrame.
+    :param reject_file_path: Path of the CSV file receiving the rejected rows.
     """
-    query = text("SELECT restaurant_id FROM restaurant WHERE name=:name")
-    with engine.connect() as conn:
-        result = conn.execute(query, {"name": restaurant_name}).fetchone()
-    return result[0] if result else None
+    engine = create_database_engine(database_url)
+    rejects = []
 
+    load_frames(engine, data, rejects)
 
-def populate_database(database_url: str, excel_file_path: str):
-    engine = create_engine(database_url)
+    write_reject_file(rejects, reject_file_path)
+    finish_load(database_url)
+    print("Populated database successfully.")
 
-    try:
-        data = pd.read_excel(excel_file_path, sheet_name=None)  # Load all sheets
 
-        ### Populate `restaurant` table
+def finish_load(database_url: str):
+    """
+    Bring derived data up to date after a bulk load.
+
+    Folds the new orders into the revenue rollups (the dashboard only reads
+    them) and refreshes the planner's statistics, since row counts changed
+    wholesale.
+
+    :param database_url: SQLite database URL.
+    """
+    database_path = database_path_from_url(database_url)
+    refresh_rollups(database_path)
+    analyze(database_path, full=True)
+
+
+def load_frames(engine, data: dict, rejects: list):
+    """
+    Validate and load sheets of the workbook layout, in dependency order.
+
+    Sheets may be partial (e.g. one chunk of a large feed): ids are resolved
+    against what the database already holds.
+
+    :param engine: SQLAlchemy engine.
+    :param data: Dictionary of sheet name to DataFrame.
+    :param rejects: List collecting the rejected rows of the run.
+    """
+    ### Populate `restaurant` table
+    if "restaurant" in data:
         restaurant_df = data["restaurant"]
         restaurant_df.rename(
             columns={"Nom": "name", "Adresse": "address"}, inplace=True
         )
-        restaurant_df.to_sql("restaurant", con=engine, if_exists="append", index=False)
-
-        ### Populate `dish` table
-        for sheet_name, restaurant_name in [
-            ("menu_le_gourmet", "Le Gourmet"),
-            ("menu_la_bonne_table", "La Bonne Table"),
-            ("menu_chez_martin", "Chez Martin"),
-        ]:
-            if sheet_name in data:
-                restaurant_id = get_restaurant_id(engine, restaurant_name)
-                df = data[sheet_name]
-                df["restaurant_id"] = restaurant_id
-                df.rename(columns={"Nom": "name", "Prix": "price"}, inplace=True)
-                df[["restaurant_id", "name", "price"]].to_sql(
-                    "dish", con=engine, if_exists="append", index=False
-                )
-
-        ### Populate `client` table
-        for sheet_name, restaurant_name in [
-            ("client_le_gourmet", "Le Gourmet"),
-            ("client_la_bonne_table", "La Bonne Table"),
-            ("client_chez_martin", "Chez Martin"),
-        ]:
-            if sheet_name in data:
-                # Get `restaurant_id` for the current restaurant
-                restaurant_id = get_restaurant_id(engine, restaurant_name)
-
-                # Load the data for the current sheet
-                df = data[sheet_name]
-
-                # Strip any extra spaces from column names for safety
-                df.columns = df.columns.str.strip()
-
-                # Debugging: Print the columns after cleaning
-                print(
-                    f"Processing sheet '{sheet_name}' with columns: {df.columns.tolist()}"
-                )
-
-                # Rename the columns to match the database schema
-                df.rename(
-                    columns={
-                        "Prénom": "first_name",
-                        "Nom": "last_name",
-                        "Email": "email",
-                        "Téléphone": "phone",
-                        "Date_Inscription": "inscription_date",
-                    },
-                    inplace=True,
-                )
-
-                # Debugging: Print the renamed columns to ensure renaming worked
-                print(f"Renamed columns for '{sheet_name}': {df.columns.tolist()}")
-
-                # Add the `restaurant_id` column
-                df["restaurant_id"] = restaurant_id
-
-                # Define the relevant columns for the `client` table
-                client_columns = [
-                    "restaurant_id",
-                    "first_name",
-                    "last_name",
-                    "email",
-                    "phone",
-                    "inscription_date",
-                ]
-
-                # Check if all required columns exist after renaming
-                if all(col in df.columns for col in client_columns):
-                    # Write the relevant data to the `client` table
-                    df[client_columns].to_sql(
-                        "client", con=engine, if_exists="append", index=False
-                    )
-                    print(
-                        f"Successfully populated `client` table from sheet '{sheet_name}'."
-                    )
-                else:
-                    # If required columns are missing, print error information
-                    missing_cols = [
-                        col for col in client_columns if col not in df.columns
-                    ]
-                    print(f"Missing columns in sheet '{sheet_name}': {missing_cols}")
-                    raise ValueError(f"Missing columns: {missing_cols}")
-
-        ### Populate `employee` table
-        if "employé" in data:
-            employee_df = data["employé"]
-
-            # Rename columns to match the database schema
-            employee_df.rename(
+        load_table(engine, restaurant_df, "restaurant", "restaurant", rejects)
+
+    restaurant_ids = get_restaurant_ids(engine)
+    known_restaurants = {"restaurant_id": restaurant_ids.values()}
+
+    ### Populate `dish` table
+    for sheet_name, restaurant_name in [
+        ("menu_le_gourmet", "Le Gourmet"),
+        ("menu_la_bonne_table", "La Bonne Table"),
+        ("menu_chez_martin", "Chez Martin"),
+    ]:
+        if sheet_name in data:
+            df = data[sheet_name]
+            df["restaurant_id"] = restaurant_ids.get(restaurant_name)
+            df.rename(columns={"Nom": "name", "Prix": "price"}, inplace=True)
+            load_table(engine, df, "dish", sheet_name, rejects, known_restaurants)
+
+    ### Populate `client` table
+    for sheet_name, restaurant_name in [
+        ("client_le_gourmet", "Le Gourmet"),
+        ("client_la_bonne_table", "La Bonne Table"),
+        ("client_chez_martin", "Chez Martin"),
+    ]:
+        if sheet_name in data:
+            # Load the data for the current sheet
+            df = data[sheet_name]
+
+            # Strip any extra spaces from column names for safety
+            df.columns = df.columns.str.strip()
+
+            # Rename the columns to match the database schema
+            df.rename(
                 columns={
-                    "Prénom": "first_name",  # Correcting "Prénom" to "first_name"
+                    "Prénom": "first_name",
                     "Nom": "last_name",
-                    "Poste": "position",
-                    "Date_Embauche": "hiring_date",
-                    "Salaire": "salary",
-                    "Restaurant_ID": "restaurant_name",
+                    "Email": "email",
+                    "Téléphone": "phone",
+                    "Date_Inscription": "inscription_date",
                 },
                 inplace=True,
             )
 
-            # Translate French positions to English
-            position_translation = {
-                "Serveur": "WAITER",
-                "Cuisinier": "COOK",
-                "Plongeur": "DISHWASHER",
-                "Responsable": "MANAGER",
-                "Chef Cuisinier": "HEAD COOK",
-            }
-            employee_df["position"] = employee_df["position"].map(position_translation)
-
-            # Debugging: Check if all position translations were successful
-            print(f"Translated positions: {employee_df['position'].unique()}")
-
-            # Map the `restaurant_id` using `restaurant_name`
-            employee_df["restaurant_id"] = employee_df["restaurant_name"].apply(
-                lambda name: get_restaurant_id(engine, name)
+            # Add the `restaurant_id` column
+            df["restaurant_id"] = restaurant_ids.get(restaurant_name)
+
+            load_table(engine, df, "client", sheet_name, rejects, known_restaurants)
+
+    ### Populate `employee` table
+    if "employé" in data:
+        employee_df = data["employé"]
+
+        # Rename columns to match the database schema
+        employee_df.rename(
+            columns={
+                "Prénom": "first_name",  # Correcting "Prénom" to "first_name"
+                "Nom": "last_name",
+                "Poste": "position",
+                "Date_Embauche": "hiring_date",
+                "Salaire": "salary",
+                "Restaurant_ID": "restaurant_name",
+            },
+            inplace=True,
+        )
+
+        # Translate French positions to English; unknown titles are kept
+        # as-is so the reject file shows the offending value
+        position_translation = {
+            "Serveur": "WAITER",
+            "Cuisinier": "COOK",
+            "Plongeur": "DISHWASHER",
+            "Responsable": "MANAGER",
+            "Chef Cuisinier": "HEAD COOK",
+        }
+        # Missing columns are left for `validate` to report as rejects
+        if "position" in employee_df.columns:
+            employee_df["position"] = (
+                employee_df["position"]
+                .map(position_translation)
+                .fillna(employee_df["position"])
             )
 
-            # Select relevant columns for the `employee` table
-            employee_df = employee_df[
-                [
-                    "restaurant_id",
-                    "first_name",
-                    "last_name",
-                    "position",
-                    "hiring_date",
-                    "salary",
-                ]
-            ]
-
-            # Write the data to the `employee` table
-            employee_df.to_sql("employee", con=engine, if_exists="append", index=False)
-
-        ### Populate `order` table
-        for sheet_name, restaurant_name in [
-            ("client_le_gourmet", "Le Gourmet"),
-            ("client_la_bonne_table", "La Bonne Table"),
-            ("client_chez_martin", "Chez Martin"),
-        ]:
-            if sheet_name in data:
-                # Load the data for the current sheet
-                df = data[sheet_name]
-
-                # Strip any extra spaces from column names for safety
-                df.columns = df.columns.str.strip()
-
-                # Debugging: Print column names before processing orders
-                print(
-                    f"Processing orders from sheet '{sheet_name}' with columns: {df.columns.tolist()}"
-                )
-
-                # Rename the relevant columns for the `order` table
-                df.rename(
-                    columns={
-                        "Date_Commande": "order_date",
-                        "Montant_Total": "total_amount",
-                    },
-                    inplace=True,
-                )
-
-                # Use a connection to fetch `email-to-client_id` mapping
-                with engine.connect() as connection:
-                    result = connection.execute(
-                        text("SELECT email, client_id FROM client")
-                    )
-                    email_to_client_id_df = pd.DataFrame(
-                        result.fetchall(), columns=["email", "client_id"]
-                    )
-
-                # Convert the DataFrame to a dictionary for fast lookup
-                email_to_client_id = dict(email_to_client_id_df.values)
-
-                # Map `client_id` to each order based on `email`
-                df["client_id"] = df["email"].map(email_to_client_id)
-
-                # Debugging: Check for unmatched emails
-                if df["client_id"].isna().any():
-                    print("Unmapped emails found in orders:")
-                    print(
-                        df[df["client_id"].isna()][
-                            ["email", "order_date", "total_amount"]
-                        ]
-                    )
-
-                # Drop rows with missing `order_date`, `total_amount`, or `client_id`
-                initial_row_count = len(df)
-                df = df.dropna(subset=["client_id", "order_date", "total_amount"])
-                final_row_count = len(df)
-
-                # Debugging: Show how many rows were dropped
-                print(
-                    f"Dropped {initial_row_count - final_row_count} rows due to missing data in 'client_id', 'order_date', or 'total_amount'."
-                )
-
-                # Select only order-related columns
-                order_columns = ["client_id", "order_date", "total_amount"]
-
-                # Check if required columns exist
-                if all(col in df.columns for col in order_columns):
-                    # Write data to the `order` table
-                    df[order_columns].to_sql(
-                        "orders", con=engine, if_exists="append", index=False
-                    )
-                    print(
-                        f"Successfully populated `order` table from sheet '{sheet_name}'."
-                    )
-                else:
-                    missing_cols = [
-                        col for col in order_columns if col not in df.columns
-                    ]
-                    print(
-                        f"Missing columns for orders in sheet '{sheet_name}': {missing_cols}"
-                    )
-                    raise ValueError(f"Missing columns: {missing_cols}")
-
-        ### Populate `supplier` table
-        if "fournisseur" in data:
-            supplier_df = data["fournisseur"]
-            supplier_df.rename(
+        # Map the `restaurant_id` using `restaurant_name`
+        if "restaurant_name" in employee_df.columns:
+            employee_df["restaurant_id"] = employee_df["restaurant_name"].map(restaurant_ids)
+
+        load_table(engine, employee_df, "employee", "employé", rejects, known_restaurants)
+
+    ### Populate `order` table
+    client_ids = get_client_ids(engine)
+    known_clients = {"client_id": client_ids.values()}
+
+    for sheet_name in [
+        "client_le_gourmet",
+        "client_la_bonne_table",
+        "client_chez_martin",
+    ]:
+        if sheet_name in data:
+            # Load the data for the current sheet (columns were renamed above)
+            df = data[sheet_name]
+
+            # Rename the relevant columns for the `order` table
+            df.rename(
                 columns={
-                    "Nom": "name",
-                    "Email": "email",
-                    "Téléphone": "phone",
-                    "Adresse": "address",
+                    "Date_Commande": "order_date",
+                    "Montant_Total": "total_amount",
                 },
                 inplace=True,
             )
-            supplier_df.to_sql("supplier", con=engine, if_exists="append", index=False)
-        
-        ### Populate `delivery` table
-        # Iterate over all sheets that start with "stocks_"
-        for sheet_name in data.keys():
-            if sheet_name.startswith("stocks_"):
-                # Extract the restaurant name from the sheet name
-                restaurant_name = sheet_name.replace("stocks_", "").strip().replace("_", " ").title()
-
-                # Get `restaurant_id` for the current restaurant
-                restaurant_id = get_restaurant_id(engine, restaurant_name)
-                if not restaurant_id:
-                    print(f"Skipping sheet '{sheet_name}' because restaurant '{restaurant_name}' was not found in the database.")
-                    continue
-
-                # Load the stock data from the current sheet
-                stock_df = data[sheet_name]
-
-                # Debugging: Print columns in the stock sheet
-                print(f"Processing sheet '{sheet_name}' with columns: {stock_df.columns.tolist()}")
-
-                # Rename columns to match the `delivery` table schema
-                stock_df.rename(
-                    columns={
-                        "Nom_Produit": "product_name",
-                        "Quantité": "quantity",
-                        "Date_Livraison": "delivery_date",
-                    },
-                    inplace=True,
-                )
-
-                # Add the `restaurant_id` column to associate deliveries with restaurants
-                stock_df["restaurant_id"] = restaurant_id
-
-                # Define the required columns for the `delivery` table
-                delivery_columns = ["restaurant_id", "product_name", "quantity", "delivery_date"]
-
-                # Ensure all required columns are present
-                if all(col in stock_df.columns for col in delivery_columns):
-                    # Insert data into the `delivery` table
-                    stock_df[delivery_columns].to_sql(
-                        "delivery", con=engine, if_exists="append", index=False
-                    )
-                    print(f"Successfully populated `delivery` table from sheet '{sheet_name}'.")
-                else:
-                    missing_cols = [col for col in delivery_columns if col not in stock_df.columns]
-                    print(f"Missing required columns in sheet '{sheet_name}': {missing_cols}")
-                    raise ValueError(f"Missing columns: {missing_cols}")
-
-        print("Populated database successfully.")
 
-    except Exception as e:
-        print(f"An error occurred while populating the database: {e}")
+            # Map `client_id` to each order based on `email`
+            if "email" in df.columns:
+                df["client_id"] = df["email"].map(client_ids)
+
+            # Rows without any order data only describe a client
+            if {"order_date", "total_amount"} <= set(df.columns):
+                no_order = df["order_date"].isna() & df["total_amount"].isna()
+                print(f"Skipped {no_order.sum()} rows without order data in sheet '{sheet_name}'.")
+                df = df[~no_order]
+
+            load_table(engine, df, "order", sheet_name, rejects, known_clients)
+
+    ### Populate `supplier` table
+    if "fournisseur" in data:
+        supplier_df = data["fournisseur"]
+        supplier_df.rename(
+            columns={
+                "Nom": "name",
+                "Email": "email",
+                "Téléphone": "phone",
+                "Adresse": "address",
+            },
+            inplace=True,
+        )
+        load_table(engine, supplier_df, "supplier", "fournisseur", rejects)
+
+    ### Populate `delivery` table
+    # Iterate over all sheets that start with "stocks_"
+    for sheet_name in data.keys():
+        if sheet_name.startswith("stocks_"):
+            # Extract the restaurant name from the sheet name
+            restaurant_name = sheet_name.replace("stocks_", "").strip().replace("_", " ").title()
+
+            # Get `restaurant_id` for the current restaurant
+            restaurant_id = restaurant_ids.get(restaurant_name)
+            if not restaurant_id:
+                print(f"Skipping sheet '{sheet_name}' because restaurant '{restaurant_name}' was not found in the database.")
+                continue
+
+            # Load the stock data from the current sheet
+            stock_df = data[sheet_name]
+
+            # Rename columns to match the `delivery` table schema
+            stock_df.rename(
+                columns={
+                    "Nom_Produit": "product_name",
+                    "Quantité": "quantity",
+                    "Date_Livraison": "delivery_date",
+                },
+                inplace=True,
+            )
+
+            # Add the `restaurant_id` column to associate deliveries with restaurants
+            stock_df["restaurant_id"] = restaurant_id
+
+            load_table(engine, stock_df, "delivery", sheet_name, rejects, known_restaurants)
 
 
 def main():
@@ -1,20 +1,26 @@
-import sqlite3
 import sys
 
-def create_restaurant(name, address):
-    conn = sqlite3.connect('restaurant.db')
-    cursor = conn.cursor()
+from repository import DATABASE_PATH, RestaurantRepository
+from write_queue import get_writer
 
+def create_restaurant(name, address, database_path=DATABASE_PATH):
     # Insert the new restaurant, letting SQLite auto-generate the restaurant_id
-    cursor.execute("""
-        INSERT INTO restaurant (name, address)
-        VALUES (?, ?)
-    """, (name, address))
-
-    conn.commit()
-    conn.close()
+    get_writer(RestaurantRepository, database_path).insert(name=name, address=address)
     print(f"Restaurant '{name}' created successfully!")
 
+
+def create_restaurants(restaurants, database_path=DATABASE_PATH):
+    """
+    Create several restaurants in a single transaction.
+
+    :param restaurants: Iterable of `(name, address)` pairs.
+    :param database_path: Path to the SQLite database file.
+    """
+    count = get_writer(RestaurantRepository, database_path).insert_many(
+        {"name": name, "address": address} for name, address in restaurants
+    )
+    print(f"{count} restaurants created successfully!")
+
 # Handle command-line arguments
 if __name__ == "__main__":
     # Check if the proper number of arguments is provided (script name, name, address)
@@ -1,4 +1,4 @@
-import sqlite3
+import json
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -6,45 +6,61 @@ from dash import dcc, html
 from dash.dependencies import Input, Output
 import dash
 
+from repository import POSITIONS, get_connection
+from rollups import ensure_rollup_tables
+
 # Database connection (replace 'restaurant_data.db' with the actual path to your SQLite database)
 DATABASE_PATH = "restaurant.db"
 
-def fetch_data_from_db(query, params=None):
-    """Helper function to fetch data from SQLite database."""
-    with sqlite3.connect(DATABASE_PATH) as conn:
-        if params:
-            return pd.read_sql_query(query, conn, params=params)
-        return pd.read_sql_query(query, conn)
+# Number of most recent orders shown in the orders chart
+RECENT_ORDERS_LIMIT = 50
+
+def fetch_data_from_db(query, params=None, database_path=DATABASE_PATH):
+    """
+    Helper function to fetch data from SQLite database.
+
+    Queries run on the thread's cached connection, so the fixed query texts
+    below are prepared once and reused from its statement cache.
+    """
+    conn = get_connection(database_path)
+    return pd.read_sql_query(query, conn, params=params)
 
-# Fetch Data From SQLite Database and Populate DataFrames
+# Queries feeding the charts. Every filter is a bound parameter on a column
+# indexed in `up.sql`: `:restaurants` and `:positions` are JSON arrays (all values
+# when nothing is selected) and the date range defaults to all dates.
 # 1. Last Orders Data
 orders_query = """
     SELECT 
         client.first_name || ' ' || client.last_name AS Client,
-        "orders".order_date AS Date_Commande,
-        "orders".total_amount AS Montant_Total
+        "order".order_date AS Date_Commande,
+        "order".total_amount AS Montant_Total
     FROM
-        "orders"
+        "order"
     JOIN
         client
     ON 
-        "orders".client_id = client.client_id
+        "order".client_id = client.client_id
+    WHERE
+        client.restaurant_id IN (SELECT value FROM json_each(:restaurants))
+        AND "order".order_date BETWEEN :start_date AND :end_date
     ORDER BY 
-        "orders".order_date DESC
+        "order".order_date DESC
+    LIMIT :recent_orders
 """
 
-orders_data = fetch_data_from_db(orders_query)
-
 # 2. Inventory Data
 inventory_query = """
     SELECT 
         delivery.product_name AS Nom_Produit,
-        delivery.quantity AS Quantité,
-        delivery.delivery_date AS Date_Livraison
+        SUM(delivery.quantity) AS Quantité
     FROM 
         delivery
+    WHERE
+        delivery.restaurant_id IN (SELECT value FROM json_each(:restaurants))
+        AND delivery.delivery_date BETWEEN :start_date AND :end_date
+    GROUP BY
+        delivery.product_name
 """
-inventory_data = fetch_data_from_db(inventory_query)
 
 # 3. Employee Data
 employee_query = """
@@ -59,10 +75,12 @@ employee_query = """
         restaurant
     ON
         employee.restaurant_id = restaurant.restaurant_id
+    WHERE
+        employee.restaurant_id IN (SELECT value FROM json_each(:restaurants))
+        AND employee.position IN (SELECT value FROM json_each(:positions))
     GROUP BY
         employee.position, restaurant.name
 """
-employee_data = fetch_data_from_db(employee_query)
 
 employee_distribution_query = """
     SELECT
@@ -74,13 +92,12 @@ employee_distribution_query = """
         restaurant
     ON
         employee.restaurant_id = restaurant.restaurant_id
+    WHERE
+        employee.restaurant_id IN (SELECT value FROM json_each(:restaurants))
+        AND employee.position IN (SELECT value FROM json_each(:positions))
     GROUP BY
         restaurant.name
 """
-restaurant_employee_distribution = fetch_data_from_db(employee_distribution_query)
-restaurant_employee_distribution_dict = dict(
-    zip(restaurant_employee_distribution["Restaurant"], restaurant_employee_distribution["Employee_Count"])
-)
 
 # 4. Menu Data
 menu_query = """
@@ -89,128 +106,272 @@ menu_query = """
         dish.price AS Prix
     FROM 
         dish
+    WHERE
+        dish.restaurant_id IN (SELECT value FROM json_each(:restaurants))
+"""
+
+# 5. Monthly Revenue Data (read from the precomputed rollups)
+revenue_query = """
+    SELECT
+        restaurant.name AS Restaurant,
+        revenue_rollup.bucket AS Mois,
+        revenue_rollup.revenue AS Chiffre_Affaires,
+        revenue_rollup.order_count AS Nombre_Commandes,
+        revenue_rollup.average_ticket AS Ticket_Moyen
+    FROM
+        revenue_rollup
+    JOIN
+        restaurant
+    ON
+        revenue_rollup.restaurant_id = restaurant.restaurant_id
+    WHERE
+        revenue_rollup.restaurant_id IN (SELECT value FROM json_each(:restaurants))
+        AND revenue_rollup.period = 'month'
+        AND revenue_rollup.bucket BETWEEN date(:start_date, 'start of month') AND :end_date
+    ORDER BY
+        revenue_rollup.bucket
 """
-menu_data = fetch_data_from_db(menu_query)
 
-# Initialize Dash App
-app = dash.Dash(__name__)
+restaurants_query = """
+    SELECT restaurant_id, name FROM restaurant ORDER BY name
+"""
 
-# Layout
-app.layout = html.Div(
-    [
-        html.H1("Restaurant Insights Dashboard", style={"textAlign": "center"}),
 
-        # Bar Chart for Last Orders
-        html.Div(
-            [
-                html.H3("Recent Orders and Total Amount"),
-                dcc.Graph(
-                    id="recent-orders-bar-chart",
-                    figure=px.bar(
-                        orders_data,
-                        x="Client",
-                        y="Montant_Total",
-                        color="Date_Commande",
-                        title="Recent Orders and Total Amount",
-                        labels={
-                            "Montant_Total": "Total Amount (€)",
-                            "Client": "Client",
-                            "Date_Commande": "Order Date",
-                        },
-                    ).update_layout(xaxis_type="category"),
-                ),
-            ]
+def get_restaurants(database_path=DATABASE_PATH):
+    """Return the `(restaurant_id, name)` pairs offered by the restaurant filter."""
+    return list(get_connection(database_path).execute(restaurants_query))
+
+
+def build_filters(restaurant_ids, all_restaurant_ids, start_date=None, end_date=None, positions=None):
+    """
+    Turn the filter values into query parameters.
+
+    Empty selections mean "everything", expressed as the full list or the
+    widest date range so each query keeps a single, index-friendly shape.
+    """
+    return {
+        "restaurants": json.dumps(list(restaurant_ids or all_restaurant_ids)),
+        "positions": json.dumps(list(positions or POSITIONS)),
+        "start_date": (start_date or "0000-01-01")[:10],
+        "end_date": (end_date or "9999-12-31")[:10],
+        "recent_orders": RECENT_ORDERS_LIMIT,
+    }
+
+
+def load_data(filters, database_path=DATABASE_PATH):
+    """Run the dashboard queries for the given filters and return their DataFrames by name."""
+    def fetch(query):
+        return fetch_data_from_db(query, filters, database_path=database_path)
+
+    restaurant_employee_distribution = fetch(employee_distribution_query)
+    return {
+        "orders": fetch(orders_query),
+        "inventory": fetch(inventory_query),
+        "employees": fetch(employee_query),
+        "employee_distribution": dict(
+            zip(
+                restaurant_employee_distribution["Restaurant"],
+                restaurant_employee_distribution["Employee_Count"],
+            )
         ),
+        "menu": fetch(menu_query),
+        "revenue": fetch(revenue_query),
+    }
+
+
+def build_figures(data):
+    """Build the chart figures from the DataFrames returned by `load_data`, by graph id."""
+    orders_data = data["orders"]
+    inventory_data = data["inventory"]
+    employee_data = data["employees"]
+    restaurant_employee_distribution_dict = data["employee_distribution"]
+    menu_data = data["menu"]
+    revenue_data = data["revenue"]
+
+    return {
+        # Bar Chart for Last Orders
+        "recent-orders-bar-chart": px.bar(
+            orders_data,
+            x="Client",
+            y="Montant_Total",
+            color="Date_Commande",
+            title="Recent Orders and Total Amount",
+            labels={
+                "Montant_Total": "Total Amount (€)",
+                "Client": "Client",
+                "Date_Commande": "Order Date",
+            },
+        ).update_layout(xaxis_type="category"),
 
         # Pie Chart for Revenue Distribution
-        html.Div(
-            [
-                html.H3("Revenue Distribution by Food Item"),
-                dcc.Graph(
-                    id="revenue-pie-chart",
-                    figure=px.pie(
-                        menu_data,
-                        names="Nom",
-                        values="Prix",
-                        title="Revenue Distribution by Food Item",
-                    ),
-                ),
-            ]
+        "revenue-pie-chart": px.pie(
+            menu_data,
+            names="Nom",
+            values="Prix",
+            title="Revenue Distribution by Food Item",
         ),
 
         # Donut Chart for Employee Distribution
-        html.Div(
-            [
-                html.H3("Employee Distribution by Restaurant"),
-                dcc.Graph(
-                    id="employee-donut-chart",
-                    figure=go.Figure(
-                        go.Pie(
-                            labels=list(restaurant_employee_distribution_dict.keys()),
-                            values=list(restaurant_employee_distribution_dict.values()),
-                            hole=0.5,
-                        )
-                    ).update_layout(title_text="Employee Distribution by Restaurant"),
-                ),
-            ]
-        ),
+        "employee-donut-chart": go.Figure(
+            go.Pie(
+                labels=list(restaurant_employee_distribution_dict.keys()),
+                values=list(restaurant_employee_distribution_dict.values()),
+                hole=0.5,
+            )
+        ).update_layout(title_text="Employee Distribution by Restaurant"),
 
         # Bar Chart for Inventory Levels
-        html.Div(
-            [
-                html.H3("Inventory Stock Levels"),
-                dcc.Graph(
-                    id="inventory-bar-chart",
-                    figure=px.bar(
-                        inventory_data,
-                        x="Nom_Produit",
-                        y="Quantité",
-                        color="Nom_Produit",
-                        title="Inventory Stock Levels",
-                        labels={"Quantité": "Stock Quantity", "Nom_Produit": "Product"},
-                    ),
-                ),
-            ]
+        "inventory-bar-chart": px.bar(
+            inventory_data,
+            x="Nom_Produit",
+            y="Quantité",
+            color="Nom_Produit",
+            title="Inventory Stock Levels",
+            labels={"Quantité": "Stock Quantity", "Nom_Produit": "Product"},
         ),
 
         # Bar Chart for Employee Count by Role
-        html.Div(
-            [
-                html.H3("Employee Count by Role"),
-                dcc.Graph(
-                    id="employee-count-bar-chart",
-                    figure=px.bar(
-                        employee_data,
-                        x="Poste",
-                        y="Count",
-                        color="Poste",
-                        title="Employee Count by Role",
-                        labels={"Count": "Number of Employees", "Poste": "Role"},
-                    ),
-                ),
-            ]
+        "employee-count-bar-chart": px.bar(
+            employee_data,
+            x="Poste",
+            y="Count",
+            color="Poste",
+            title="Employee Count by Role",
+            labels={"Count": "Number of Employees", "Poste": "Role"},
         ),
 
         # Bar Chart for Average Salary by Role
-        html.Div(
-            [
-                html.H3("Average Salary by Role"),
-                dcc.Graph(
-                    id="average-salary-bar-chart",
-                    figure=px.bar(
-                        employee_data,
-                        x="Poste",
-                        y="Average_Salary",
-                        color="Poste",
-                        title="Average Salary by Role",
-                        labels={"Average_Salary": "Salary (€)", "Poste": "Role"},
-                    ),
-                ),
-            ]
+        "average-salary-bar-chart": px.bar(
+            employee_data,
+            x="Poste",
+            y="Average_Salary",
+            color="Poste",
+            title="Average Salary by Role",
+            labels={"Average_Salary": "Salary (€)", "Poste": "Role"},
         ),
-    ]
-)
+
+        # Line Chart for Monthly Revenue
+        "monthly-revenue-line-chart": px.line(
+            revenue_data,
+            x="Mois",
+            y="Chiffre_Affaires",
+            color="Restaurant",
+            markers=True,
+            hover_data=["Nombre_Commandes", "Ticket_Moyen"],
+            title="Monthly Revenue by Restaurant",
+            labels={
+                "Chiffre_Affaires": "Revenue (€)",
+                "Mois": "Month",
+                "Nombre_Commandes": "Orders",
+                "Ticket_Moyen": "Average Ticket (€)",
+            },
+        ),
+    }
+
+
+# Graph ids and section titles, in display order
+GRAPHS = [
+    ("recent-orders-bar-chart", "Recent Orders and Total Amount"),
+    ("revenue-pie-chart", "Revenue Distribution by Food Item"),
+    ("employee-donut-chart", "Employee Distribution by Restaurant"),
+    ("inventory-bar-chart", "Inventory Stock Levels"),
+    ("employee-count-bar-chart", "Employee Count by Role"),
+    ("average-salary-bar-chart", "Average Salary by Role"),
+    ("monthly-revenue-line-chart", "Monthly Revenue by Restaurant"),
+]
+
+
+def create_layout(restaurants):
+    """
+    Build the dashboard layout: the filters and one empty graph per chart.
+    The graphs are filled by the filter callback, which Dash runs on page load.
+    """
+    return html.Div(
+        [
+            html.H1("Restaurant Insights Dashboard", style={"textAlign": "center"}),
+
+            # Filters
+            html.Div(
+                [
+                    dcc.Dropdown(
+                        id="restaurant-filter",
+                        options=[
+                            {"label": name, "value": restaurant_id}
+                            for restaurant_id, name in restaurants
+                        ],
+                        multi=True,
+                        placeholder="All restaurants",
+                    ),
+                    dcc.DatePickerRange(
+                        id="date-filter",
+                        display_format="YYYY-MM-DD",
+                        clearable=True,
+                    ),
+                    dcc.Dropdown(
+                        id="position-filter",
+                        options=list(POSITIONS),
+                        multi=True,
+                        placeholder="All positions",
+                    ),
+                ],
+                style={"display": "grid", "gridTemplateColumns": "2fr 1fr 2fr", "gap": "1em"},
+            ),
+        ]
+        + [
+            html.Div([html.H3(title), dcc.Graph(id=graph_id)])
+            for graph_id, title in GRAPHS
+        ]
+    )
+
+
+def register_callbacks(app, database_path=DATABASE_PATH):
+    """
+    Refresh every chart when a filter changes. Filtering and aggregation
+    happen in SQL, so only the aggregated selection is sent to the browser.
+    Restaurants are read again on each update, so restaurants created while
+    the dashboard runs are part of "all restaurants". The callback never
+    writes: the revenue chart shows the rollups as of the last load or
+    `resto rollup refresh`.
+    """
+    @app.callback(
+        [Output(graph_id, "figure") for graph_id, _ in GRAPHS],
+        [
+            Input("restaurant-filter", "value"),
+            Input("date-filter", "start_date"),
+            Input("date-filter", "end_date"),
+            Input("position-filter", "value"),
+        ],
+    )
+    def update_figures(restaurant_ids, start_date, end_date, positions):
+        all_restaurant_ids = [
+            restaurant_id for restaurant_id, _ in get_restaurants(database_path)
+        ]
+        filters = build_filters(
+            restaurant_ids, all_restaurant_ids, start_date, end_date, positions
+        )
+        figures = build_figures(load_data(filters, database_path))
+        return [figures[graph_id] for graph_id, _ in GRAPHS]
+
+    return update_figures
+
+
+def create_app(database_path=DATABASE_PATH):
+    """
+    Create the Dash app. Queries only run when a page is served, not when
+    the module is imported.
+
+    :param database_path: Path to the SQLite database file.
+    """
+    # The revenue chart reads the rollup table, which may not exist yet if
+    # the database was never loaded or refreshed
+    ensure_rollup_tables(database_path)
+    app = dash.Dash(__name__)
+    # A function, so the restaurant filter lists the current restaurants on each page load
+    app.layout = lambda: create_layout(get_restaurants(database_path))
+    register_callbacks(app, database_path)
+    return app
+
 
 # Run the App
 if __name__ == "__main__":
-    app.run_server(debug=True)
+    create_app().run(debug=True)
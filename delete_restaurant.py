@@ -1,29 +1,34 @@
-import sqlite3
 import sys
 
-def delete_restaurant_by_id(restaurant_id):
+from repository import DATABASE_PATH, RestaurantRepository
+from write_queue import get_writer
+
+def delete_restaurant_by_id(restaurant_id, database_path=DATABASE_PATH):
     """
     Delete a restaurant by its ID.
 
     :param restaurant_id: The ID of the restaurant to delete.
+    :param database_path: Path to the SQLite database file.
     """
-    conn = sqlite3.connect('restaurant.db')
-    cursor = conn.cursor()
-
     # Execute the DELETE statement
-    cursor.execute("""
-        DELETE FROM restaurant
-        WHERE restaurant_id = ?
-    """, (restaurant_id,))
+    deleted = get_writer(RestaurantRepository, database_path).delete(restaurant_id)
 
     # Provide feedback based on the operation
-    if cursor.rowcount > 0:
+    if deleted > 0:
         print(f"Restaurant with ID {restaurant_id} deleted successfully!")
     else:
         print(f"No restaurant found with ID {restaurant_id}.")
 
-    conn.commit()
-    conn.close()
+
+def delete_restaurants_by_id(restaurant_ids, database_path=DATABASE_PATH):
+    """
+    Delete several restaurants in a single transaction.
+
+    :param restaurant_ids: Iterable of restaurant IDs to delete.
+    :param database_path: Path to the SQLite database file.
+    """
+    deleted = get_writer(RestaurantRepository, database_path).delete_many(restaurant_ids)
+    print(f"{deleted} restaurants deleted successfully!")
 
 # Handle command-line arguments
 if __name__ == "__main__":
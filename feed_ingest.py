@@ -0,0 +1,180 @@
+"""
+Load a directory of CSV or Parquet feeds with the workbook's layout.
+
+Each file holds one sheet of `restaurant_data.xlsx`: the file name (without
+extension) is the sheet name and the columns keep their French names, e.g.
+`restaurant.csv`, `menu_le_gourmet.parquet`, `client_chez_martin.csv`,
+`employé.csv`, `fournisseur.csv`, `stocks_la_bonne_table.parquet`.
+
+Files are read memory-mapped, optionally in chunks, and go through the same
+column mappings, validation and bulk writes as the Excel path
+(`createDB.load_frames`), skipping the slow xlsx decoding.
+"""
+import os
+
+import pandas as pd
+
+from createDB import create_database_engine, finish_load, load_frames
+from validation import write_reject_file
+
+FEED_EXTENSIONS = (".parquet", ".csv")
+
+# Sheets are loaded in the workbook's order so referenced rows exist first
+# and ids come out as with the Excel path; unknown sheets come last
+SHEET_ORDER = [
+    "restaurant",
+    "menu_le_gourmet",
+    "menu_la_bonne_table",
+    "menu_chez_martin",
+    "client_le_gourmet",
+    "client_la_bonne_table",
+    "client_chez_martin",
+    "employé",
+    "fournisseur",
+    "stocks_le_gourmet",
+    "stocks_la_bonne_table",
+    "stocks_chez_martin",
+]
+
+
+def _sheet_rank(sheet_name: str) -> int:
+    if sheet_name in SHEET_ORDER:
+        return SHEET_ORDER.index(sheet_name)
+    return len(SHEET_ORDER)
+
+
+def find_feed_files(directory: str) -> dict:
+    """
+    Find the feed files of a directory, in load order.
+
+    :param directory: Directory holding the CSV/Parquet files.
+    :return: Dictionary of sheet name to file path (Parquet wins over CSV).
+    """
+    files = {}
+    for file_name in sorted(os.listdir(directory)):
+        sheet_name, extension = os.path.splitext(file_name)
+        if extension.lower() not in FEED_EXTENSIONS:
+            continue
+        current = files.get(sheet_name)
+        if current is None or current.endswith(".csv"):
+            files[sheet_name] = os.path.join(directory, file_name)
+
+    return dict(sorted(files.items(), key=lambda item: (_sheet_rank(item[0]), item[0])))
+
+
+def read_feed_file(path: str, chunksize: int = None):
+    """
+    Read a feed file, memory-mapped, as one or more DataFrames.
+
+    CSV values are kept as text (phone numbers keep their leading zeros);
+    validation converts dates and amounts like it does for the workbook.
+
+    :param path: Path to a `.csv` or `.parquet` file.
+    :param chunksize: Rows per DataFrame, or None to read the whole file.
+    :return: Iterator of DataFrames.
+    """
+    if path.endswith(".csv"):
+        if chunksize:
+            yield from pd.read_csv(path, dtype=str, memory_map=True, chunksize=chunksize)
+        else:
+            yield pd.read_csv(path, dtype=str, memory_map=True)
+        return
+
+    if chunksize:
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path, memory_map=True)
+        for batch in parquet_file.iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield pd.read_parquet(path, memory_map=True)
+
+
+def read_feed_directory(directory: str) -> dict:
+    """
+    Read every feed file of a directory at once.
+
+    :param directory: Directory holding the CSV/Parquet files.
+    :return: Dictionary of sheet name to DataFrame, like `pd.read_excel(sheet_name=None)`.
+    """
+    return {
+        sheet_name: next(read_feed_file(path))
+        for sheet_name, path in find_feed_files(directory).items()
+    }
+
+
+def ingest_feed_directory(
+    database_url: str,
+    directory: str,
+    reject_file_path: str = "rejects.csv",
+    chunksize: int = None,
+):
+    """
+    Populate the database from a directory of CSV/Parquet feeds.
+
+    :param database_url: SQLite database URL.
+    :param directory: Directory holding the CSV/Parquet files.
+    :param reject_file_path: Path of the CSV file receiving the rejected rows.
+    :param chunksize: Rows loaded per batch, or None to load all files at once
+        exactly like the workbook. In chunks, each sheet is loaded in turn, so
+        orders are matched to clients already loaded at that point.
+    """
+    feed_files = find_feed_files(directory)
+    if not feed_files:
+        print(f"No CSV or Parquet files found in '{directory}'.")
+        return
+
+    engine = create_database_engine(database_url)
+    rejects = []
+
+    if not chunksize:
+        load_frames(engine, read_feed_directory(directory), rejects)
+        write_reject_file(rejects, reject_file_path)
+        finish_load(database_url)
+        print("Populated database successfully.")
+        return
+
+    for sheet_name, path in feed_files.items():
+        print(f"Loading '{path}' as sheet '{sheet_name}'.")
+        chunks = read_feed_file(path, chunksize)
+        while True:
+            # Only the read is guarded: `load_frames` reports its own
+            # failures and adds the rows to the rejects
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                break
+            except Exception as e:
+                print(f"An error occurred while reading '{path}': {e}")
+                break
+            load_frames(engine, {sheet_name: chunk}, rejects)
+
+    write_reject_file(rejects, reject_file_path)
+    finish_load(database_url)
+    print("Populated database successfully.")
+
+
+def export_workbook_to_feed(excel_file_path: str, directory: str, file_format: str = "csv"):
+    """
+    Write each sheet of the workbook to its own CSV or Parquet feed file.
+
+    :param excel_file_path: Path to the Excel workbook.
+    :param directory: Output directory (created if needed).
+    :param file_format: Either "csv" or "parquet".
+    """
+    if file_format not in ("csv", "parquet"):
+        raise ValueError(f"Unknown feed format '{file_format}', expected 'csv' or 'parquet'.")
+
+    os.makedirs(directory, exist_ok=True)
+    data = pd.read_excel(excel_file_path, sheet_name=None)
+
+    for sheet_name, df in data.items():
+        path = os.path.join(directory, f"{sheet_name}.{file_format}")
+        if file_format == "csv":
+            df.to_csv(path, index=False)
+        else:
+            # Mixed text/number columns (e.g. "1700€") are stored as text
+            text_columns = df.select_dtypes(include="object").columns
+            df.astype({col: "string" for col in text_columns}).to_parquet(path, index=False)
+
+    print(f"Exported {len(data)} sheets to '{directory}' as {file_format}.")
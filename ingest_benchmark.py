@@ -0,0 +1,104 @@
+"""
+Compare loading the Excel workbook with loading the same data as CSV and
+Parquet feeds.
+
+The workbook is exported to temporary feed directories, then each source is
+timed twice: reading alone, and a full load (schema, validation and writes)
+into a fresh database. The fastest of `repeat` runs is reported.
+"""
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from createDB import load_sheets
+from feed_ingest import export_workbook_to_feed, ingest_feed_directory, read_feed_directory
+from schema import initialize_database
+
+
+def _best_time(function, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        # Keep the loaders' progress messages out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            function()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def benchmark_ingest(
+    excel_file_path: str = "restaurant_data.xlsx",
+    schema_path: str = "up.sql",
+    repeat: int = 3,
+    chunksize: int = None,
+):
+    """
+    Print read and full-load times for the Excel, CSV and Parquet sources.
+
+    :param excel_file_path: Path to the Excel workbook.
+    :param schema_path: Path to the SQL schema script.
+    :param repeat: Runs per measurement (the fastest is reported).
+    :param chunksize: Rows per batch for the feed loads, or None.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        feed_dirs = {}
+        for file_format in ("csv", "parquet"):
+            directory = os.path.join(tmp, file_format)
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    export_workbook_to_feed(excel_file_path, directory, file_format)
+            except ImportError as e:
+                print(f"Skipping {file_format}: {e}")
+                continue
+            feed_dirs[file_format] = directory
+
+        runs = {}
+
+        def fresh_database_url(source):
+            runs[source] = runs.get(source, 0) + 1
+            database_url = f"sqlite:///{os.path.join(tmp, f'{source}-{runs[source]}.db')}"
+            with contextlib.redirect_stdout(io.StringIO()):
+                initialize_database(database_url, schema_path)
+            return database_url
+
+        def load_excel():
+            database_url = fresh_database_url("excel")
+            data = pd.read_excel(excel_file_path, sheet_name=None)
+            load_sheets(database_url, data, os.path.join(tmp, "rejects.csv"))
+
+        def feed_loader(source, directory):
+            def load_feed():
+                ingest_feed_directory(
+                    fresh_database_url(source),
+                    directory,
+                    os.path.join(tmp, "rejects.csv"),
+                    chunksize,
+                )
+
+            return load_feed
+
+        sources = [
+            ("excel", lambda: pd.read_excel(excel_file_path, sheet_name=None), load_excel)
+        ]
+        for source, directory in feed_dirs.items():
+            sources.append(
+                (
+                    source,
+                    lambda directory=directory: read_feed_directory(directory),
+                    feed_loader(source, directory),
+                )
+            )
+
+        print(f"{'source':<10}{'read [ms]':>12}{'load [ms]':>12}{'vs excel':>10}")
+        excel_load = None
+        for source, read, load in sources:
+            read_ms = _best_time(read, repeat)
+            load_ms = _best_time(load, repeat)
+            if excel_load is None:
+                excel_load = load_ms
+            print(f"{source:<10}{read_ms:>12.1f}{load_ms:>12.1f}{excel_load / load_ms:>9.1f}x")
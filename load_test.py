@@ -0,0 +1,590 @@
+"""
+Concurrent mixed-workload load test.
+
+Replays a weighted mix of the dashboard queries and of restaurant/order
+writes from several processes, each running several threads, against a
+generated database. Every storage setting combination (journal mode and
+cache size) runs on its own copy of the database, and the report gives,
+per operation, the latency percentiles, throughput, "database is
+locked"/"busy" errors and the time spent waiting for locks.
+
+Lock waits are measured by the harness itself: connections use a busy
+timeout of 0 by default, so an attempt that hits a lock fails at once, is
+counted as a busy error and retried after `retry_backoff` seconds, up to
+`max_retries` times. The time before the successful attempt counts as lock
+wait. With a non-zero busy timeout SQLite waits internally instead, and the
+wait only shows up in the latencies.
+
+`populate` loads a generated workbook client sheet (new clients, each with
+an order) through `createDB.load_frames`, like `resto load` does. It uses
+the loader's own SQLAlchemy connection and busy timeout, so its lock waits
+only show up in its latencies.
+"""
+import contextlib
+import datetime
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from repository import (
+    POSITIONS,
+    OrderRepository,
+    RestaurantRepository,
+    close_connections,
+    get_connection,
+)
+
+# Operation weights used when no mix is given
+DEFAULT_MIX = {
+    "orders": 30,
+    "inventory": 15,
+    "employees": 10,
+    "menu": 10,
+    "revenue": 10,
+    "create": 5,
+    "update": 8,
+    "delete": 2,
+    "order": 8,
+    "populate": 2,
+}
+
+READ_OPERATIONS = ("orders", "inventory", "employees", "menu", "revenue")
+WRITE_OPERATIONS = ("create", "update", "delete", "order", "populate")
+
+# Rows of the workbook client sheet loaded by one `populate` operation
+POPULATE_BATCH = 500
+
+# Client sheets of the workbook and the restaurant each one belongs to; the
+# generated database names its first restaurants after them so `populate`
+# resolves them like the real load does
+CLIENT_SHEETS = {
+    "client_le_gourmet": "Le Gourmet",
+    "client_la_bonne_table": "La Bonne Table",
+    "client_chez_martin": "Chez Martin",
+}
+
+PRODUCTS = ("Tomates", "Poulet", "Fromage", "Pâtes", "Farine", "Oeufs", "Lait", "Riz")
+
+
+def parse_mix(mix: str) -> dict:
+    """
+    Parse an operation mix such as "orders=40,update=10".
+
+    :param mix: Comma-separated `operation=weight` pairs.
+    :return: Dictionary of operation to weight.
+    :raises ValueError: If an operation is unknown or a weight is invalid.
+    """
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in READ_OPERATIONS + WRITE_OPERATIONS:
+            raise ValueError(
+                f"Unknown operation '{name}', expected one of "
+                f"{list(READ_OPERATIONS + WRITE_OPERATIONS)}."
+            )
+        weights[name] = float(weight)
+    return weights
+
+
+def _random_date(rng: random.Random) -> str:
+    return f"{rng.randint(2021, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+
+def generate_database(
+    database_path: str,
+    schema_path: str = "up.sql",
+    restaurants: int = 10,
+    clients: int = 5000,
+    orders: int = 100000,
+    seed: int = 0,
+):
+    """
+    Create a database with synthetic data shaped like the workbook's.
+
+    :param database_path: Path of the database file to create (overwritten).
+    :param schema_path: Path to the SQL schema script.
+    :param restaurants: Number of restaurants.
+    :param clients: Number of clients.
+    :param orders: Number of orders.
+    :param seed: Seed of the random generator.
+    """
+    from rollups import refresh_rollups
+
+    if os.path.exists(database_path):
+        os.remove(database_path)
+
+    rng = random.Random(seed)
+    names = list(CLIENT_SHEETS.values())
+    conn = sqlite3.connect(database_path)
+    with open(schema_path, "r") as file:
+        conn.executescript(file.read())
+
+    with conn:
+        conn.executemany(
+            "INSERT INTO restaurant (name, address) VALUES (?, ?)",
+            (
+                (names[i - 1] if i <= len(names) else f"Restaurant {i}", f"{i} Rue du Test, Paris")
+                for i in range(1, restaurants + 1)
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO dish (restaurant_id, name, price) VALUES (?, ?, ?)",
+            (
+                (r, f"Plat {r}-{i}", round(rng.uniform(5, 40), 2))
+                for r in range(1, restaurants + 1)
+                for i in range(20)
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO client (restaurant_id, first_name, last_name, email, phone, inscription_date)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    rng.randint(1, restaurants),
+                    f"Prenom{i}",
+                    f"Nom{i}",
+                    f"client{i}@example.com",
+                    f"06{rng.randint(0, 99999999):08d}",
+                    _random_date(rng),
+                )
+                for i in range(clients)
+            ),
+        )
+        conn.executemany(
+            'INSERT INTO "order" (client_id, order_date, total_amount) VALUES (?, ?, ?)',
+            (
+                (rng.randint(1, clients), _random_date(rng), round(rng.uniform(8, 150), 2))
+                for _ in range(orders)
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO employee (restaurant_id, position, first_name, last_name, hiring_date, salary)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    r,
+                    rng.choice(POSITIONS),
+                    f"Prenom{r}-{i}",
+                    f"Nom{r}-{i}",
+                    _random_date(rng),
+                    rng.randint(1600, 3500),
+                )
+                for r in range(1, restaurants + 1)
+                for i in range(20)
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO delivery (restaurant_id, product_name, quantity, delivery_date)"
+            " VALUES (?, ?, ?, ?)",
+            (
+                (r, rng.choice(PRODUCTS), rng.randint(10, 200), _random_date(rng))
+                for r in range(1, restaurants + 1)
+                for _ in range(500)
+            ),
+        )
+    conn.close()
+
+    # The dashboard's revenue chart reads the rollups
+    refresh_rollups(database_path)
+    close_connections()
+
+
+class OperationStats:
+    """Latencies and lock counters of one operation type."""
+
+    __slots__ = ("latencies", "busy_errors", "failures", "lock_wait")
+
+    def __init__(self):
+        self.latencies = []
+        self.busy_errors = 0
+        self.failures = 0
+        self.lock_wait = 0.0
+
+    def merge(self, other: dict):
+        self.latencies.extend(other["latencies"])
+        self.busy_errors += other["busy_errors"]
+        self.failures += other["failures"]
+        self.lock_wait += other["lock_wait"]
+
+    def to_dict(self) -> dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+def _is_lock_error(error: sqlite3.OperationalError) -> bool:
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+class Workload:
+    """
+    Operations run by one worker thread.
+
+    :param database_path: Path to the SQLite database file.
+    :param rng: Random generator of the thread.
+    """
+
+    def __init__(self, database_path: str, rng: random.Random):
+        import dashboard
+
+        self.dashboard = dashboard
+        self.database_path = database_path
+        self.rng = rng
+        self.restaurants = RestaurantRepository(database_path)
+        self.orders = OrderRepository(database_path)
+        self.connection = get_connection(database_path)
+        self.engine = None
+        self.populated = 0
+
+        self.restaurant_ids = [
+            row[0] for row in self.connection.execute("SELECT restaurant_id FROM restaurant")
+        ]
+        self.max_client_id = self.connection.execute(
+            "SELECT MAX(client_id) FROM client"
+        ).fetchone()[0]
+        self.created = []
+
+    def _filters(self):
+        # A dashboard user looking at one restaurant over a random quarter
+        start = datetime.date.fromisoformat(_random_date(self.rng))
+        end = start + datetime.timedelta(days=90)
+        return self.dashboard.build_filters(
+            [self.rng.choice(self.restaurant_ids)],
+            self.restaurant_ids,
+            start.isoformat(),
+            end.isoformat(),
+        )
+
+    def _read(self, query):
+        return self.connection.execute(query, self._filters()).fetchall()
+
+    def orders_operation(self):
+        return self._read(self.dashboard.orders_query)
+
+    def inventory_operation(self):
+        return self._read(self.dashboard.inventory_query)
+
+    def employees_operation(self):
+        return self._read(self.dashboard.employee_query)
+
+    def menu_operation(self):
+        return self._read(self.dashboard.menu_query)
+
+    def revenue_operation(self):
+        return self._read(self.dashboard.revenue_query)
+
+    def create_operation(self):
+        self.created.append(
+            self.restaurants.insert(name="Load Test", address="1 Rue du Test")
+        )
+
+    def update_operation(self):
+        self.restaurants.update(
+            self.rng.choice(self.restaurant_ids), address=f"{self.rng.randint(1, 999)} Rue du Test"
+        )
+
+    def delete_operation(self):
+        # Only restaurants created by this thread, so reads keep their data
+        if self.created:
+            self.restaurants.delete(self.created.pop())
+
+    def _random_order(self):
+        return {
+            "client_id": self.rng.randint(1, self.max_client_id),
+            "order_date": _random_date(self.rng),
+            "total_amount": round(self.rng.uniform(8, 150), 2),
+        }
+
+    def order_operation(self):
+        self.orders.insert(**self._random_order())
+
+    def _client_sheet(self):
+        import pandas as pd
+
+        # A workbook client sheet: every row is a new client with one order
+        prefix = f"populate{self.rng.getrandbits(32):08x}-{self.populated}"
+        self.populated += 1
+        rows = [
+            {
+                "Prénom": f"Prenom{i}",
+                "Nom": f"Nom{i}",
+                "Email": f"{prefix}-{i}@example.com",
+                "Téléphone": f"06{self.rng.randint(0, 99999999):08d}",
+                "Date_Inscription": _random_date(self.rng),
+                "Date_Commande": _random_date(self.rng),
+                "Montant_Total": round(self.rng.uniform(8, 150), 2),
+            }
+            for i in range(POPULATE_BATCH)
+        ]
+        return pd.DataFrame(rows)
+
+    def populate_operation(self):
+        # The same path as `resto load`: pandas to_sql through SQLAlchemy, one
+        # write transaction per table, with the loader's own busy timeout
+        from createDB import create_database_engine, load_frames
+
+        if self.engine is None:
+            self.engine = create_database_engine(f"sqlite:///{self.database_path}")
+        rejects = []
+        load_frames(self.engine, {self.rng.choice(list(CLIENT_SHEETS)): self._client_sheet()}, rejects)
+
+        # The loader reports failed writes as rejected rows instead of raising.
+        # Clients may already be committed, so this is a failure, not a retry.
+        rejected = sum(len(frame) for frame in rejects)
+        if rejected:
+            reasons = {reason for frame in rejects for reason in frame["reason"]}
+            raise RuntimeError(f"populate rejected {rejected} rows: {'; '.join(sorted(reasons))}")
+
+
+def _run_thread(config, seed, stop_at, results):
+    database_path = config["database_path"]
+    names = list(config["mix"])
+    weights = [config["mix"][name] for name in names]
+    stats = {name: OperationStats() for name in names}
+    error = None
+
+    try:
+        conn = get_connection(database_path)
+        conn.execute(f"PRAGMA cache_size = {int(config['cache_size'])}")
+
+        # Setup reads wait on locks with the connection's default busy timeout;
+        # only the measured operations run with the configured one
+        rng = random.Random(seed)
+        workload = Workload(database_path, rng)
+        conn.execute(f"PRAGMA busy_timeout = {int(config['busy_timeout_ms'])}")
+
+        while time.monotonic() < stop_at:
+            name = rng.choices(names, weights)[0]
+            operation = getattr(workload, f"{name}_operation")
+            op_stats = stats[name]
+
+            start = time.perf_counter()
+            for attempt in range(config["max_retries"] + 1):
+                attempt_start = time.perf_counter()
+                try:
+                    operation()
+                except Exception as e:
+                    if not (isinstance(e, sqlite3.OperationalError) and _is_lock_error(e)):
+                        op_stats.failures += 1
+                        break
+                    op_stats.busy_errors += 1
+                    if attempt == config["max_retries"]:
+                        op_stats.failures += 1
+                        break
+                    time.sleep(config["retry_backoff"])
+                else:
+                    end = time.perf_counter()
+                    op_stats.latencies.append(end - start)
+                    op_stats.lock_wait += attempt_start - start
+                    break
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        # Recorded even if the thread died, so the report never drops a worker
+        results.append(
+            {
+                "operations": {name: op_stats.to_dict() for name, op_stats in stats.items()},
+                "error": error,
+            }
+        )
+
+
+def _run_process(config, process_index):
+    stop_at = time.monotonic() + config["duration"]
+    results = []
+    threads = [
+        threading.Thread(
+            target=_run_thread,
+            args=(config, config["seed"] + 1000 * process_index + i, stop_at, results),
+        )
+        for i in range(config["threads"])
+    ]
+    # The loader driven by `populate` reports its progress on stdout
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return results
+
+
+def _percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_load_test(
+    database_path: str,
+    mix: dict = None,
+    processes: int = 2,
+    threads: int = 4,
+    duration: float = 10.0,
+    journal_mode: str = "delete",
+    cache_size: int = -2000,
+    busy_timeout_ms: int = 0,
+    max_retries: int = 5000,
+    retry_backoff: float = 0.001,
+    seed: int = 0,
+) -> dict:
+    """
+    Run the workload once against `database_path`.
+
+    :param database_path: Path to the SQLite database file.
+    :param mix: Dictionary of operation to weight (default: `DEFAULT_MIX`).
+    :param processes: Number of worker processes.
+    :param threads: Number of threads per process.
+    :param duration: Seconds each thread keeps issuing operations.
+    :param journal_mode: SQLite journal mode ("delete", "wal", ...).
+    :param cache_size: `PRAGMA cache_size` of every connection (negative is KiB).
+    :param busy_timeout_ms: `PRAGMA busy_timeout` of every connection.
+    :param max_retries: Retries after a lock error before counting a failure.
+    :param retry_backoff: Seconds slept before each retry.
+    :param seed: Seed of the random generators.
+    :return: Dictionary of operation to its summary, plus the settings used
+        and the errors of worker threads that stopped early.
+    """
+    conn = sqlite3.connect(database_path)
+    conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    conn.close()
+
+    config = {
+        "database_path": database_path,
+        "mix": mix or DEFAULT_MIX,
+        "threads": threads,
+        "duration": duration,
+        "cache_size": cache_size,
+        "busy_timeout_ms": busy_timeout_ms,
+        "max_retries": max_retries,
+        "retry_backoff": retry_backoff,
+        "seed": seed,
+    }
+
+    # Fresh interpreters, so no SQLite connection is shared across a fork
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes) as pool:
+        process_results = pool.starmap(
+            _run_process, [(config, index) for index in range(processes)]
+        )
+
+    totals = {name: OperationStats() for name in config["mix"]}
+    thread_errors = []
+    for thread_results in process_results:
+        for thread_result in thread_results:
+            for name, op_stats in thread_result["operations"].items():
+                totals[name].merge(op_stats)
+            if thread_result["error"]:
+                thread_errors.append(thread_result["error"])
+
+    summary = {}
+    for name, op_stats in totals.items():
+        latencies = sorted(op_stats.latencies)
+        summary[name] = {
+            "count": len(latencies),
+            "throughput": len(latencies) / duration,
+            "p50_ms": _percentile(latencies, 0.50) * 1000,
+            "p95_ms": _percentile(latencies, 0.95) * 1000,
+            "p99_ms": _percentile(latencies, 0.99) * 1000,
+            "busy_errors": op_stats.busy_errors,
+            "failures": op_stats.failures,
+            "lock_wait_ms": op_stats.lock_wait * 1000,
+        }
+
+    return {
+        "settings": {
+            "journal_mode": journal_mode,
+            "cache_size": cache_size,
+            "processes": processes,
+            "threads": threads,
+            "duration": duration,
+            "busy_timeout_ms": busy_timeout_ms,
+        },
+        "operations": summary,
+        "thread_errors": thread_errors,
+    }
+
+
+def print_report(result: dict):
+    """
+    Print the summary returned by `run_load_test`.
+
+    :param result: Result of `run_load_test`.
+    """
+    settings = result["settings"]
+    print(
+        f"\njournal_mode={settings['journal_mode']} cache_size={settings['cache_size']} "
+        f"processes={settings['processes']} threads={settings['threads']} "
+        f"duration={settings['duration']}s busy_timeout={settings['busy_timeout_ms']}ms"
+    )
+    print(
+        f"{'operation':<12}{'count':>8}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        f"{'busy':>7}{'failed':>8}{'lock wait ms':>14}"
+    )
+    for name, stats in result["operations"].items():
+        print(
+            f"{name:<12}{stats['count']:>8}{stats['throughput']:>9.1f}"
+            f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}"
+            f"{stats['busy_errors']:>7}{stats['failures']:>8}{stats['lock_wait_ms']:>14.1f}"
+        )
+    if result["thread_errors"]:
+        print(f"{len(result['thread_errors'])} worker threads stopped early:")
+        for error in sorted(set(result["thread_errors"])):
+            print(f"  {error}")
+
+
+def run_load_tests(
+    journal_modes=("delete", "wal"),
+    cache_sizes=(-2000,),
+    schema_path: str = "up.sql",
+    clients: int = 5000,
+    orders: int = 100000,
+    output_path: str = None,
+    **options,
+) -> list:
+    """
+    Run the workload for every journal mode and cache size combination,
+    each on a fresh copy of the same generated database.
+
+    :param journal_modes: Journal modes to compare.
+    :param cache_sizes: Cache sizes to compare.
+    :param schema_path: Path to the SQL schema script.
+    :param clients: Number of generated clients.
+    :param orders: Number of generated orders.
+    :param output_path: Optional JSON file receiving all results.
+    :param options: Other arguments of `run_load_test`.
+    :return: List of results of `run_load_test`.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        template_path = os.path.join(tmp, "template.db")
+        print(f"Generating a database with {clients} clients and {orders} orders...")
+        generate_database(
+            template_path, schema_path, clients=clients, orders=orders,
+            seed=options.get("seed", 0),
+        )
+
+        for journal_mode in journal_modes:
+            for cache_size in cache_sizes:
+                database_path = os.path.join(tmp, f"{journal_mode}{cache_size}.db")
+                shutil.copyfile(template_path, database_path)
+                result = run_load_test(
+                    database_path,
+                    journal_mode=journal_mode,
+                    cache_size=cache_size,
+                    **options,
+                )
+                print_report(result)
+                results.append(result)
+
+    if output_path:
+        with open(output_path, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nWrote results to '{output_path}'.")
+    return results
@@ -0,0 +1,265 @@
+"""
+Storage maintenance: planner statistics, incremental vacuum and page tuning.
+
+- `analyze` refreshes the statistics in `sqlite_stat1` the query planner uses
+  to pick indexes; run it after large loads (the loaders do).
+- `incremental_vacuum` hands free pages back to the file system in short,
+  time-boxed steps, so it can run on a schedule next to the dashboard and
+  the writer daemon. It needs `auto_vacuum = INCREMENTAL`, which new
+  databases get from `schema.initialize_database`; older files are converted
+  once with `rebuild` (a full VACUUM, which can also change the page size).
+- `storage_report` reports the file size, free-page ratio and planner
+  statistics; `run_maintenance` prints it before and after.
+"""
+import os
+import time
+from collections import namedtuple
+
+from repository import DATABASE_PATH, get_connection
+
+AUTO_VACUUM_MODES = ("none", "full", "incremental")
+
+# Rows sampled per index by `analyze`; keeps it fast on large tables
+ANALYSIS_LIMIT = 1000
+
+# `PRAGMA optimize` flags: 0x02 runs ANALYZE where needed, 0x10000 checks
+# every table instead of only those queried on the current connection
+OPTIMIZE_ALL_TABLES = 0x10002
+
+StorageReport = namedtuple(
+    "StorageReport",
+    [
+        "file_size",
+        "page_size",
+        "page_count",
+        "freelist_count",
+        "free_ratio",
+        "auto_vacuum",
+        "journal_mode",
+        "analyzed_indexes",
+        "table_rows",
+    ],
+)
+
+
+def _pragma(conn, name: str):
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def get_planner_statistics(database_path: str = DATABASE_PATH) -> dict:
+    """
+    Read the planner statistics gathered by ANALYZE.
+
+    :param database_path: Path to the SQLite database file.
+    :return: Dictionary of (table, index) to the `sqlite_stat1` stat string,
+        empty if the database was never analyzed.
+    """
+    conn = get_connection(database_path)
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+    ).fetchone()
+    if not exists:
+        return {}
+    rows = conn.execute("SELECT tbl, idx, stat FROM sqlite_stat1 ORDER BY tbl, idx")
+    return {(table, index): stat for table, index, stat in rows}
+
+
+def storage_report(database_path: str = DATABASE_PATH) -> StorageReport:
+    """
+    Measure the storage of the database.
+
+    :param database_path: Path to the SQLite database file.
+    :return: A `StorageReport`; `table_rows` holds the planner's row
+        estimate per analyzed table.
+    :raises FileNotFoundError: If the database does not exist; connecting
+        would create an empty file.
+    """
+    if not os.path.exists(database_path):
+        raise FileNotFoundError(f"Database '{database_path}' does not exist.")
+
+    conn = get_connection(database_path)
+    page_count = _pragma(conn, "page_count")
+    freelist_count = _pragma(conn, "freelist_count")
+    statistics = get_planner_statistics(database_path)
+
+    table_rows = {}
+    for (table, index), stat in statistics.items():
+        table_rows.setdefault(table, int(stat.split()[0]))
+
+    return StorageReport(
+        file_size=os.path.getsize(database_path),
+        page_size=_pragma(conn, "page_size"),
+        page_count=page_count,
+        freelist_count=freelist_count,
+        free_ratio=freelist_count / page_count if page_count else 0.0,
+        auto_vacuum=AUTO_VACUUM_MODES[_pragma(conn, "auto_vacuum")],
+        journal_mode=_pragma(conn, "journal_mode"),
+        analyzed_indexes=sum(1 for _, index in statistics if index),
+        table_rows=table_rows,
+    )
+
+
+def print_storage_report(report: StorageReport, title: str = "Storage"):
+    """
+    Print a storage report.
+
+    :param report: Report from `storage_report`.
+    :param title: Heading of the report.
+    """
+    print(f"{title}:")
+    print(f"  file size      {report.file_size / 1024:.1f} KiB")
+    print(f"  pages          {report.page_count} x {report.page_size} bytes")
+    print(f"  free pages     {report.freelist_count} ({report.free_ratio:.1%})")
+    print(f"  auto_vacuum    {report.auto_vacuum}, journal_mode {report.journal_mode}")
+    if report.table_rows:
+        print(
+            f"  statistics     {len(report.table_rows)} tables, "
+            f"{report.analyzed_indexes} indexes analyzed"
+        )
+        for table, rows in sorted(report.table_rows.items()):
+            print(f"    {table:<20}{rows:>10} rows")
+    else:
+        print("  statistics     none (never analyzed)")
+
+
+def analyze(database_path: str = DATABASE_PATH, full: bool = False):
+    """
+    Refresh the query planner's statistics.
+
+    :param database_path: Path to the SQLite database file.
+    :param full: Run ANALYZE on every index (sampling `ANALYSIS_LIMIT` rows
+        each) instead of letting `PRAGMA optimize` pick the tables whose
+        statistics are missing or were used by the connection's queries.
+        Use it after bulk inserts or deletes.
+    """
+    conn = get_connection(database_path)
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    if full or not get_planner_statistics(database_path):
+        conn.execute("ANALYZE")
+    else:
+        conn.execute(f"PRAGMA optimize = {OPTIMIZE_ALL_TABLES}")
+    conn.commit()
+
+
+def incremental_vacuum(
+    database_path: str = DATABASE_PATH,
+    max_seconds: float = 1.0,
+    pages_per_step: int = 256,
+) -> int:
+    """
+    Return free pages to the file system in short steps until none are
+    left or the time budget is spent.
+
+    Each step is its own short write transaction, so readers and the writer
+    daemon are only held up for one step at a time.
+
+    :param database_path: Path to the SQLite database file.
+    :param max_seconds: Time budget; the step in progress finishes first.
+    :param pages_per_step: Free pages released per step.
+    :return: The number of pages released.
+    """
+    conn = get_connection(database_path)
+    if AUTO_VACUUM_MODES[_pragma(conn, "auto_vacuum")] != "incremental":
+        print(
+            f"'{database_path}' does not use incremental auto-vacuum; "
+            "run `resto maintain --rebuild` once to convert it."
+        )
+        return 0
+
+    released = 0
+    deadline = time.monotonic() + max_seconds
+    while time.monotonic() < deadline:
+        free = _pragma(conn, "freelist_count")
+        if not free:
+            break
+        conn.execute(f"PRAGMA incremental_vacuum({pages_per_step})").fetchall()
+        conn.commit()
+        released += free - _pragma(conn, "freelist_count")
+    return released
+
+
+def rebuild(
+    database_path: str = DATABASE_PATH,
+    page_size: int = None,
+    auto_vacuum: str = "incremental",
+):
+    """
+    Rebuild the database file with a full VACUUM.
+
+    Applies a new page size and auto-vacuum mode to an existing database.
+    The whole file is rewritten under an exclusive lock, so run it while the
+    database is idle. The page size cannot change in WAL mode.
+
+    :param database_path: Path to the SQLite database file.
+    :param page_size: New page size in bytes, or None to keep the current one.
+    :param auto_vacuum: One of `AUTO_VACUUM_MODES`.
+    """
+    if auto_vacuum not in AUTO_VACUUM_MODES:
+        raise ValueError(
+            f"Unknown auto_vacuum mode '{auto_vacuum}', expected one of {list(AUTO_VACUUM_MODES)}."
+        )
+
+    conn = get_connection(database_path)
+    if page_size:
+        conn.execute(f"PRAGMA page_size = {int(page_size)}")
+    conn.execute(f"PRAGMA auto_vacuum = {auto_vacuum}")
+    conn.execute("VACUUM")
+
+
+def run_maintenance(
+    database_path: str = DATABASE_PATH,
+    analyze_all: bool = False,
+    vacuum_seconds: float = 1.0,
+    pages_per_step: int = 256,
+    rebuild_database: bool = False,
+    page_size: int = None,
+):
+    """
+    Run one maintenance pass and print the storage before and after.
+
+    :param database_path: Path to the SQLite database file.
+    :param analyze_all: Run a full ANALYZE instead of `PRAGMA optimize`
+        even if no free pages were released.
+    :param vacuum_seconds: Time budget of the incremental vacuum.
+    :param pages_per_step: Free pages released per vacuum step.
+    :param rebuild_database: Rebuild the file first (switches it to
+        incremental auto-vacuum and applies `page_size`).
+    :param page_size: New page size for the rebuild.
+    """
+    if not os.path.exists(database_path):
+        print(f"Database '{database_path}' does not exist.")
+        return
+
+    before = storage_report(database_path)
+    print_storage_report(before, "Before")
+
+    start = time.perf_counter()
+    if rebuild_database:
+        rebuild(database_path, page_size)
+        print("Rebuilt the database file.")
+    else:
+        released = incremental_vacuum(database_path, vacuum_seconds, pages_per_step)
+        print(f"Released {released} free pages.")
+    # Free pages mean rows were deleted, which `PRAGMA optimize` does not
+    # notice: re-sample every index then
+    analyze(database_path, full=analyze_all or rebuild_database or before.freelist_count > 0)
+    print(f"Maintenance took {time.perf_counter() - start:.2f}s.")
+
+    print_storage_report(storage_report(database_path), "After")
+
+
+def schedule_maintenance(database_path: str = DATABASE_PATH, interval: float = 3600.0, **options):
+    """
+    Run `run_maintenance` every `interval` seconds until interrupted.
+
+    :param database_path: Path to the SQLite database file.
+    :param interval: Seconds between the start of two passes.
+    :param options: Passed on to `run_maintenance`.
+    """
+    try:
+        while True:
+            start = time.monotonic()
+            run_maintenance(database_path, **options)
+            time.sleep(max(interval - (time.monotonic() - start), 0))
+    except KeyboardInterrupt:
+        pass
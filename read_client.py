@@ -1,17 +1,12 @@
-import sqlite3
+from repository import DATABASE_PATH, ClientRepository
 
-def read_restaurants():
-    conn = sqlite3.connect('restaurant.db')
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT * FROM client")
-    rows = cursor.fetchall()
-    
-    conn.close()
+def read_clients(database_path=DATABASE_PATH):
+    rows = ClientRepository(database_path).all()
 
     print("clients:")
     for row in rows:
         print(row)
 
 # Example usage
-read_restaurants()
+if __name__ == "__main__":
+    read_clients()
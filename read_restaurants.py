@@ -1,17 +1,12 @@
-import sqlite3
+from repository import DATABASE_PATH, RestaurantRepository
 
-def read_restaurants():
-    conn = sqlite3.connect('restaurant.db')
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT * FROM restaurant")
-    rows = cursor.fetchall()
-    
-    conn.close()
+def read_restaurants(database_path=DATABASE_PATH):
+    rows = RestaurantRepository(database_path).all()
 
     print("Restaurants:")
     for row in rows:
         print(row)
 
 # Example usage
-read_restaurants()
+if __name__ == "__main__":
+    read_restaurants()
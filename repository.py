@@ -0,0 +1,316 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+
+# Database connection (replace 'restaurant.db' with the actual path to your SQLite database)
+DATABASE_PATH = "restaurant.db"
+
+# Seconds a connection waits for another writer's lock before raising
+# "database is locked"
+BUSY_TIMEOUT = 30.0
+
+# Number of compiled statements each connection keeps; every repository only
+# ever issues the fixed statements built in `Repository.__init__`.
+STATEMENT_CACHE_SIZE = 256
+
+# Bytes of the database file each connection memory-maps for reads (0 keeps
+# SQLite's default). `mmap_size` is a per-connection setting, so it is taken
+# from the environment rather than stored in the database.
+MMAP_SIZE = int(os.environ.get("RESTO_MMAP_SIZE", "0"))
+
+# Values allowed by the CHECK constraint on `employee.position` in `up.sql`
+POSITIONS = ("HEAD COOK", "COOK", "DISHWASHER", "MANAGER", "WAITER")
+
+# One connection per (thread, database file), reused across calls
+_local = threading.local()
+
+
+def get_connection(database_path: str = DATABASE_PATH) -> sqlite3.Connection:
+    """
+    Return the connection for `database_path` owned by the current thread,
+    opening it on first use.
+
+    :param database_path: Path to the SQLite database file (e.g., restaurant.db).
+    :return: A reusable `sqlite3.Connection`.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(database_path)
+    if conn is None:
+        conn = sqlite3.connect(
+            database_path,
+            timeout=BUSY_TIMEOUT,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        if MMAP_SIZE:
+            conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        connections[database_path] = conn
+    return conn
+
+
+def close_connections():
+    """Close every connection opened by the current thread."""
+    connections = getattr(_local, "connections", {})
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class Repository:
+    """
+    Data access for a single table.
+
+    All SQL is built once per repository, so every call reuses the same
+    prepared statements from the connection's statement cache. Rows are
+    returned as namedtuples, which carry no per-instance `__dict__`.
+    """
+
+    table = None
+    key = None
+    columns = ()
+    row_type = None
+
+    def __init__(self, database_path: str = DATABASE_PATH):
+        self.database_path = database_path
+
+        table = _quote(self.table)
+        key = _quote(self.key)
+        fields = [_quote(col) for col in self.columns]
+        selected = ", ".join([key] + fields)
+
+        self._select_one = f"SELECT {selected} FROM {table} WHERE {key} = ?"
+        self._select_many = (
+            f"SELECT {selected} FROM {table} "
+            f"WHERE {key} IN (SELECT value FROM json_each(?))"
+        )
+        self._select_all = f"SELECT {selected} FROM {table}"
+        self._insert = (
+            f"INSERT INTO {table} ({', '.join(fields)}) "
+            f"VALUES ({', '.join('?' for _ in fields)})"
+        )
+        # NULL parameters keep the current value, so partial updates share one statement
+        self._update = (
+            f"UPDATE {table} SET "
+            + ", ".join(f"{field} = COALESCE(?, {field})" for field in fields)
+            + f" WHERE {key} = ?"
+        )
+        self._delete = f"DELETE FROM {table} WHERE {key} = ?"
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        return get_connection(self.database_path)
+
+    def _row_factory(self, cursor, row):
+        return self.row_type._make(row)
+
+    def _cursor(self) -> sqlite3.Cursor:
+        cursor = self.connection.cursor()
+        cursor.row_factory = self._row_factory
+        return cursor
+
+    def _write(self, method: str, sql: str, params) -> sqlite3.Cursor:
+        conn = self.connection
+        # Inside a caller's transaction (e.g. a group commit) the caller commits
+        if conn.in_transaction:
+            return getattr(conn, method)(sql, params)
+        with conn:
+            return getattr(conn, method)(sql, params)
+
+    def _values(self, fields: dict) -> tuple:
+        unknown = set(fields) - set(self.columns)
+        if unknown:
+            raise ValueError(f"Unknown columns for `{self.table}`: {sorted(unknown)}")
+        return tuple(fields.get(col) for col in self.columns)
+
+    ### Reads
+    def get(self, row_id):
+        """
+        Fetch a single row by primary key.
+
+        :param row_id: Primary key of the row.
+        :return: The row, or None if it does not exist.
+        """
+        return self._cursor().execute(self._select_one, (row_id,)).fetchone()
+
+    def get_many(self, row_ids) -> list:
+        """
+        Fetch several rows by primary key with a single statement.
+
+        :param row_ids: Iterable of primary keys.
+        :return: The matching rows (missing keys are skipped).
+        """
+        ids = json.dumps([int(row_id) for row_id in row_ids])
+        return self._cursor().execute(self._select_many, (ids,)).fetchall()
+
+    def all(self) -> list:
+        """
+        Fetch every row of the table.
+
+        :return: All rows.
+        """
+        return self._cursor().execute(self._select_all).fetchall()
+
+    ### Writes
+    def insert(self, **fields) -> int:
+        """
+        Insert a row, letting SQLite auto-generate the primary key.
+
+        :param fields: Column values for the new row.
+        :return: The primary key of the new row.
+        """
+        cursor = self._write("execute", self._insert, self._values(fields))
+        return cursor.lastrowid
+
+    def insert_many(self, rows) -> int:
+        """
+        Insert several rows in a single transaction.
+
+        :param rows: Iterable of dicts mapping column names to values.
+        :return: The number of inserted rows.
+        """
+        cursor = self._write(
+            "executemany", self._insert, (self._values(row) for row in rows)
+        )
+        return cursor.rowcount
+
+    def update(self, row_id, **fields) -> int:
+        """
+        Update the given columns of a row; omitted or None columns are kept.
+
+        :param row_id: Primary key of the row to update.
+        :param fields: New column values.
+        :return: The number of updated rows (0 if the row does not exist).
+        """
+        cursor = self._write("execute", self._update, self._values(fields) + (row_id,))
+        return cursor.rowcount
+
+    def update_many(self, updates) -> int:
+        """
+        Apply several partial updates in a single transaction.
+
+        :param updates: Iterable of `(row_id, fields)` pairs.
+        :return: The number of updated rows.
+        """
+        cursor = self._write(
+            "executemany",
+            self._update,
+            (self._values(fields) + (row_id,) for row_id, fields in updates),
+        )
+        return cursor.rowcount
+
+    def delete(self, row_id) -> int:
+        """
+        Delete a row by primary key.
+
+        :param row_id: Primary key of the row to delete.
+        :return: The number of deleted rows (0 if the row does not exist).
+        """
+        cursor = self._write("execute", self._delete, (row_id,))
+        return cursor.rowcount
+
+    def delete_many(self, row_ids) -> int:
+        """
+        Delete several rows in a single transaction.
+
+        :param row_ids: Iterable of primary keys.
+        :return: The number of deleted rows.
+        """
+        cursor = self._write(
+            "executemany", self._delete, ((row_id,) for row_id in row_ids)
+        )
+        return cursor.rowcount
+
+
+### Row types
+Restaurant = namedtuple("Restaurant", ["restaurant_id", "name", "address"])
+Dish = namedtuple("Dish", ["dish_id", "restaurant_id", "name", "price"])
+Client = namedtuple(
+    "Client",
+    [
+        "client_id",
+        "restaurant_id",
+        "first_name",
+        "last_name",
+        "email",
+        "phone",
+        "inscription_date",
+    ],
+)
+Order = namedtuple("Order", ["order_id", "client_id", "order_date", "total_amount"])
+Employee = namedtuple(
+    "Employee",
+    [
+        "employee_id",
+        "restaurant_id",
+        "position",
+        "first_name",
+        "last_name",
+        "hiring_date",
+        "salary",
+    ],
+)
+Delivery = namedtuple(
+    "Delivery",
+    ["delivery_id", "restaurant_id", "product_name", "quantity", "delivery_date"],
+)
+Supplier = namedtuple(
+    "Supplier", ["supplier_id", "name", "email", "phone", "address"]
+)
+
+
+### Repositories
+class RestaurantRepository(Repository):
+    table = "restaurant"
+    key = "restaurant_id"
+    columns = Restaurant._fields[1:]
+    row_type = Restaurant
+
+
+class DishRepository(Repository):
+    table = "dish"
+    key = "dish_id"
+    columns = Dish._fields[1:]
+    row_type = Dish
+
+
+class ClientRepository(Repository):
+    table = "client"
+    key = "client_id"
+    columns = Client._fields[1:]
+    row_type = Client
+
+
+class OrderRepository(Repository):
+    table = "order"
+    key = "order_id"
+    columns = Order._fields[1:]
+    row_type = Order
+
+
+class EmployeeRepository(Repository):
+    table = "employee"
+    key = "employee_id"
+    columns = Employee._fields[1:]
+    row_type = Employee
+
+
+class DeliveryRepository(Repository):
+    table = "delivery"
+    key = "delivery_id"
+    columns = Delivery._fields[1:]
+    row_type = Delivery
+
+
+class SupplierRepository(Repository):
+    table = "supplier"
+    key = "supplier_id"
+    columns = Supplier._fields[1:]
+    row_type = Supplier
@@ -0,0 +1,510 @@
+"""
+Single entry point for the restaurant database tools.
+
+Usage: python resto.py <command> [options]   (see `python resto.py --help`)
+
+Every command imports what it needs inside its handler, so the cost of
+pandas, SQLAlchemy or Dash is only paid by the commands that use them and
+nothing runs when this module is imported.
+"""
+import argparse
+import os
+import sys
+
+DATABASE_PATH = "restaurant.db"
+
+# Modules each command imports, used by `startup` to measure cold starts
+COMMAND_MODULES = {
+    "init": ["schema"],
+    "load": ["createDB"],
+    "ingest": ["feed_ingest"],
+    "export-feed": ["feed_ingest"],
+    "ingest-bench": ["ingest_benchmark"],
+    "drop": ["dropDB"],
+    "create": ["create_restaurant"],
+    "update": ["update_restaurant"],
+    "delete": ["delete_restaurant"],
+    "read": ["repository"],
+    "rollup": ["rollups"],
+    "maintain": ["maintenance"],
+    "load-test": ["load_test"],
+    "writer": ["write_queue"],
+    "dashboard": ["dashboard"],
+}
+
+TABLES = ["restaurant", "dish", "client", "order", "employee", "delivery", "supplier"]
+
+
+def init_command(args):
+    from schema import initialize_database
+
+    initialize_database(
+        f"sqlite:///{args.database}", args.schema, args.page_size, args.auto_vacuum
+    )
+
+
+def load_command(args):
+    from createDB import initialize_database, populate_database
+
+    database_url = f"sqlite:///{args.database}"
+    initialize_database(database_url, args.schema, args.page_size, args.auto_vacuum)
+    populate_database(database_url, args.excel, args.rejects)
+
+
+def ingest_command(args):
+    from feed_ingest import ingest_feed_directory
+    from schema import initialize_database
+
+    database_url = f"sqlite:///{args.database}"
+    initialize_database(database_url, args.schema, args.page_size, args.auto_vacuum)
+    ingest_feed_directory(database_url, args.directory, args.rejects, args.chunksize)
+
+
+def export_feed_command(args):
+    from feed_ingest import export_workbook_to_feed
+
+    export_workbook_to_feed(args.excel, args.directory, args.format)
+
+
+def ingest_bench_command(args):
+    from ingest_benchmark import benchmark_ingest
+
+    benchmark_ingest(args.excel, args.schema, repeat=args.repeat, chunksize=args.chunksize)
+
+
+def drop_command(args):
+    from dropDB import drop_database
+
+    drop_database(args.database)
+
+
+def create_command(args):
+    from create_restaurant import create_restaurant
+
+    create_restaurant(args.name, args.address, database_path=args.database)
+
+
+def update_command(args):
+    from update_restaurant import update_restaurant_by_id
+
+    update_restaurant_by_id(
+        args.restaurant_id,
+        name=args.name,
+        address=args.address,
+        database_path=args.database,
+    )
+
+
+def delete_command(args):
+    from delete_restaurant import delete_restaurant_by_id, delete_restaurants_by_id
+
+    if len(args.restaurant_ids) == 1:
+        delete_restaurant_by_id(args.restaurant_ids[0], database_path=args.database)
+    else:
+        delete_restaurants_by_id(args.restaurant_ids, database_path=args.database)
+
+
+def read_command(args):
+    import repository
+
+    repo_class = getattr(repository, f"{args.table.title()}Repository")
+    repo = repo_class(args.database)
+    rows = repo.get_many(args.ids) if args.ids else repo.all()
+
+    print(f"{args.table}:")
+    for row in rows[: args.limit] if args.limit else rows:
+        print(row)
+
+
+def rollup_command(args):
+    import rollups
+
+    if args.action == "refresh":
+        if args.every and args.full:
+            print("Error: --every only runs incremental refreshes, drop --full.")
+            sys.exit(1)
+        if args.every:
+            rollups.schedule_refresh(args.database, args.every * 60)
+        else:
+            rollups.refresh_rollups(args.database, full=args.full)
+    elif args.action == "get":
+        print(rollups.get_bucket(args.restaurant_id, args.period, args.bucket, args.database))
+    else:
+        trends = rollups.get_trends(
+            args.period, args.restaurant_id, args.window, args.database
+        )
+        for trend in trends:
+            print(trend)
+
+
+def maintain_command(args):
+    from maintenance import (
+        print_storage_report,
+        run_maintenance,
+        schedule_maintenance,
+        storage_report,
+    )
+
+    if args.page_size and not args.rebuild:
+        print("Error: --page-size only takes effect with --rebuild.")
+        sys.exit(1)
+    if not os.path.exists(args.database):
+        print(f"Error: database '{args.database}' does not exist.")
+        sys.exit(1)
+
+    if args.report:
+        print_storage_report(storage_report(args.database))
+        return
+
+    options = dict(
+        analyze_all=args.analyze_all,
+        vacuum_seconds=args.vacuum_seconds,
+        pages_per_step=args.pages_per_step,
+        rebuild_database=args.rebuild,
+        page_size=args.page_size,
+    )
+    if args.every:
+        schedule_maintenance(args.database, args.every * 60, **options)
+    else:
+        run_maintenance(args.database, **options)
+
+
+def writer_command(args):
+    from write_queue import serve
+
+    serve(
+        args.database,
+        args.socket,
+        max_batch=args.max_batch,
+        max_latency=args.max_latency_ms / 1000,
+    )
+
+
+def load_test_command(args):
+    from load_test import parse_mix, run_load_tests
+
+    try:
+        mix = parse_mix(args.mix) if args.mix else None
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    run_load_tests(
+        journal_modes=args.journal_modes,
+        cache_sizes=args.cache_sizes,
+        schema_path=args.schema,
+        clients=args.clients,
+        orders=args.orders,
+        output_path=args.output,
+        mix=mix,
+        processes=args.processes,
+        threads=args.threads,
+        duration=args.duration,
+        busy_timeout_ms=args.busy_timeout_ms,
+        max_retries=args.max_retries,
+        seed=args.seed,
+    )
+
+
+def dashboard_command(args):
+    from dashboard import create_app
+
+    create_app(args.database).run(
+        host=args.host, port=args.port, debug=args.debug
+    )
+
+
+def startup_command(args):
+    from startup_benchmark import report_startup
+
+    commands = args.commands or list(COMMAND_MODULES)
+    unknown = [command for command in commands if command not in COMMAND_MODULES]
+    if unknown:
+        print(f"Error: unknown commands {unknown}, expected some of {list(COMMAND_MODULES)}.")
+        sys.exit(1)
+
+    report_startup(commands, repeat=args.repeat, top=args.top)
+
+
+def import_command_modules(command: str):
+    """
+    Import the modules used by a command without running it.
+
+    :param command: Name of the command (a key of `COMMAND_MODULES`).
+    """
+    import importlib
+
+    for module in COMMAND_MODULES[command]:
+        importlib.import_module(module)
+
+
+def add_storage_arguments(parser: argparse.ArgumentParser):
+    """Add the options that only apply when the database file is created."""
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        help="Page size in bytes for a new database (power of two, 512-65536).",
+    )
+    parser.add_argument(
+        "--auto-vacuum",
+        choices=["none", "full", "incremental"],
+        default="incremental",
+        help="Auto-vacuum mode for a new database (default: incremental).",
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="resto", description="Restaurant network database tools."
+    )
+    parser.add_argument(
+        "--database",
+        default=DATABASE_PATH,
+        help=f"Path to the SQLite database file (default: {DATABASE_PATH}).",
+    )
+    parser.add_argument(
+        "--mmap-size",
+        type=int,
+        help="Bytes of the database file memory-mapped by each connection.",
+    )
+    parser.add_argument(
+        "--writer-socket",
+        help="Send create/update/delete writes to the writer daemon on this socket.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    init = subparsers.add_parser("init", help="Create the database schema.")
+    init.add_argument("--schema", default="up.sql", help="SQL schema script.")
+    add_storage_arguments(init)
+    init.set_defaults(handler=init_command)
+
+    load = subparsers.add_parser(
+        "load", help="Create the schema if needed and load the Excel workbook."
+    )
+    load.add_argument("--schema", default="up.sql", help="SQL schema script.")
+    load.add_argument(
+        "--excel", default="restaurant_data.xlsx", help="Excel workbook to load."
+    )
+    load.add_argument(
+        "--rejects", default="rejects.csv", help="CSV file receiving rejected rows."
+    )
+    add_storage_arguments(load)
+    load.set_defaults(handler=load_command)
+
+    ingest = subparsers.add_parser(
+        "ingest",
+        help="Create the schema if needed and load a directory of CSV/Parquet feeds.",
+    )
+    ingest.add_argument("directory", help="Directory with one file per workbook sheet.")
+    ingest.add_argument("--schema", default="up.sql", help="SQL schema script.")
+    ingest.add_argument(
+        "--rejects", default="rejects.csv", help="CSV file receiving rejected rows."
+    )
+    ingest.add_argument("--chunksize", type=int, help="Rows loaded per batch.")
+    add_storage_arguments(ingest)
+    ingest.set_defaults(handler=ingest_command)
+
+    export_feed = subparsers.add_parser(
+        "export-feed", help="Write each workbook sheet to a CSV/Parquet feed file."
+    )
+    export_feed.add_argument("directory", help="Output directory.")
+    export_feed.add_argument(
+        "--excel", default="restaurant_data.xlsx", help="Excel workbook to export."
+    )
+    export_feed.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    export_feed.set_defaults(handler=export_feed_command)
+
+    ingest_bench = subparsers.add_parser(
+        "ingest-bench", help="Compare Excel, CSV and Parquet load times."
+    )
+    ingest_bench.add_argument(
+        "--excel", default="restaurant_data.xlsx", help="Excel workbook to compare."
+    )
+    ingest_bench.add_argument("--schema", default="up.sql", help="SQL schema script.")
+    ingest_bench.add_argument(
+        "--repeat", type=int, default=3, help="Runs per measurement (best is kept)."
+    )
+    ingest_bench.add_argument("--chunksize", type=int, help="Rows per feed batch.")
+    ingest_bench.set_defaults(handler=ingest_bench_command)
+
+    drop = subparsers.add_parser("drop", help="Delete the database file.")
+    drop.set_defaults(handler=drop_command)
+
+    create = subparsers.add_parser("create", help="Create a restaurant.")
+    create.add_argument("name")
+    create.add_argument("address")
+    create.set_defaults(handler=create_command)
+
+    update = subparsers.add_parser("update", help="Update a restaurant.")
+    update.add_argument("restaurant_id", type=int)
+    update.add_argument("--name")
+    update.add_argument("--address")
+    update.set_defaults(handler=update_command)
+
+    delete = subparsers.add_parser("delete", help="Delete one or more restaurants.")
+    delete.add_argument("restaurant_ids", type=int, nargs="+")
+    delete.set_defaults(handler=delete_command)
+
+    read = subparsers.add_parser("read", help="Print the rows of a table.")
+    read.add_argument("table", choices=TABLES)
+    read.add_argument("ids", type=int, nargs="*", help="Only print these ids.")
+    read.add_argument("--limit", type=int, help="Print at most this many rows.")
+    read.set_defaults(handler=read_command)
+
+    rollup = subparsers.add_parser("rollup", help="Refresh or read revenue rollups.")
+    rollup_actions = rollup.add_subparsers(dest="action", required=True)
+    refresh = rollup_actions.add_parser(
+        "refresh", help="Fold orders above the watermark into the rollups."
+    )
+    refresh.add_argument("--full", action="store_true", help="Rebuild every bucket.")
+    refresh.add_argument(
+        "--every", type=float, help="Repeat every this many minutes until interrupted."
+    )
+    get = rollup_actions.add_parser("get", help="Print a single bucket.")
+    get.add_argument("restaurant_id", type=int)
+    get.add_argument("period", choices=["day", "week", "month"])
+    get.add_argument("bucket", help="First day of the bucket (YYYY-MM-DD).")
+    trends = rollup_actions.add_parser(
+        "trends", help="Print buckets with moving averages and deltas."
+    )
+    trends.add_argument("--period", choices=["day", "week", "month"], default="month")
+    trends.add_argument("--restaurant-id", type=int)
+    trends.add_argument(
+        "--window", type=int, default=3, help="Buckets in the moving average."
+    )
+    rollup.set_defaults(handler=rollup_command)
+
+    maintain = subparsers.add_parser(
+        "maintain",
+        help="Refresh planner statistics and release free pages, reporting storage before and after.",
+    )
+    maintain.add_argument(
+        "--report", action="store_true", help="Only print the storage report."
+    )
+    maintain.add_argument(
+        "--analyze-all",
+        action="store_true",
+        help="Run a full ANALYZE instead of PRAGMA optimize.",
+    )
+    maintain.add_argument(
+        "--vacuum-seconds",
+        type=float,
+        default=1.0,
+        help="Time budget of the incremental vacuum.",
+    )
+    maintain.add_argument(
+        "--pages-per-step", type=int, default=256, help="Free pages released per vacuum step."
+    )
+    maintain.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Rewrite the file with a full VACUUM, switching it to incremental auto-vacuum.",
+    )
+    maintain.add_argument("--page-size", type=int, help="New page size for --rebuild.")
+    maintain.add_argument(
+        "--every", type=float, help="Repeat every this many minutes until interrupted."
+    )
+    maintain.set_defaults(handler=maintain_command)
+
+    writer = subparsers.add_parser(
+        "writer", help="Run the group-commit writer daemon."
+    )
+    writer.add_argument(
+        "--socket", default="resto-writer.sock", help="Unix socket to listen on."
+    )
+    writer.add_argument(
+        "--max-batch", type=int, default=256, help="Requests per group commit."
+    )
+    writer.add_argument(
+        "--max-latency-ms",
+        type=float,
+        default=5.0,
+        help="Time to wait for more requests before committing a group.",
+    )
+    writer.set_defaults(handler=writer_command)
+
+    load_test = subparsers.add_parser(
+        "load-test",
+        help="Replay concurrent dashboard reads and CRUD writes on a generated database.",
+    )
+    load_test.add_argument(
+        "--mix",
+        help="Operation weights, e.g. 'orders=40,update=10,populate=1' "
+        "(operations: orders, inventory, employees, menu, revenue, "
+        "create, update, delete, order, populate; populate loads a "
+        "500-row client sheet through the `resto load` path).",
+    )
+    load_test.add_argument("--processes", type=int, default=2)
+    load_test.add_argument("--threads", type=int, default=4, help="Threads per process.")
+    load_test.add_argument(
+        "--duration", type=float, default=10.0, help="Seconds per storage setting."
+    )
+    load_test.add_argument(
+        "--journal-modes", nargs="+", default=["delete", "wal"], help="Journal modes to compare."
+    )
+    load_test.add_argument(
+        "--cache-sizes",
+        nargs="+",
+        type=int,
+        default=[-2000],
+        help="PRAGMA cache_size values to compare (negative is KiB).",
+    )
+    load_test.add_argument(
+        "--busy-timeout-ms",
+        type=int,
+        default=0,
+        help="SQLite busy timeout; 0 lets the harness retry and measure lock waits.",
+    )
+    load_test.add_argument(
+        "--max-retries", type=int, default=5000, help="Retries (1 ms apart) after a lock error."
+    )
+    load_test.add_argument("--clients", type=int, default=5000)
+    load_test.add_argument("--orders", type=int, default=100000)
+    load_test.add_argument("--schema", default="up.sql", help="SQL schema script.")
+    load_test.add_argument("--seed", type=int, default=0)
+    load_test.add_argument("--output", help="JSON file receiving the results.")
+    load_test.set_defaults(handler=load_test_command)
+
+    dashboard = subparsers.add_parser("dashboard", help="Run the Dash dashboard.")
+    dashboard.add_argument("--host", default="127.0.0.1")
+    dashboard.add_argument("--port", type=int, default=8050)
+    dashboard.add_argument("--debug", action="store_true")
+    dashboard.set_defaults(handler=dashboard_command)
+
+    startup = subparsers.add_parser(
+        "startup", help="Report the cold-start time of each command."
+    )
+    startup.add_argument(
+        "commands", nargs="*", metavar="command", help="Commands to measure (default: all)."
+    )
+    startup.add_argument(
+        "--repeat", type=int, default=5, help="Cold starts per command (best is kept)."
+    )
+    startup.add_argument(
+        "--top", type=int, default=5, help="Slowest imports listed per command."
+    )
+    startup.set_defaults(handler=startup_command)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.mmap_size is not None:
+        # Read by `repository` when it is first imported
+        os.environ["RESTO_MMAP_SIZE"] = str(args.mmap_size)
+    if args.writer_socket:
+        # Picked up by `write_queue.get_writer` in the CRUD helpers
+        os.environ["RESTO_WRITER_SOCKET"] = args.writer_socket
+        try:
+            args.handler(args)
+        except RuntimeError as e:
+            # Raised by `write_queue.WriteClient` when the daemon refuses a write
+            print(f"Error: {e}")
+            sys.exit(1)
+        return
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,385 @@
+"""
+Daily, weekly and monthly revenue rollups per restaurant.
+
+Rollups are stored in `revenue_rollup`, one row per (restaurant, period,
+bucket), so reading a bucket is a primary key lookup. `refresh_rollups`
+only looks at orders above the `order_id` watermark stored in
+`rollup_watermark` and recomputes the buckets those orders fall into.
+
+The loaders refresh the rollups after each load; orders written by the
+CRUD scripts or the writer daemon are folded in by `resto rollup refresh`
+(`--every` keeps it running). The watermark only tracks new orders: after
+orders are updated or deleted (e.g. by deleting a restaurant), run
+`refresh_rollups(full=True)`.
+"""
+import time
+from collections import namedtuple
+
+from repository import DATABASE_PATH, get_connection
+
+ROLLUP_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS "revenue_rollup" (
+        restaurant_id INTEGER NOT NULL,
+        period TEXT CHECK(period IN ('day','week','month')) NOT NULL,
+        bucket TEXT NOT NULL, -- first day of the bucket (YYYY-MM-DD)
+        revenue REAL NOT NULL,
+        order_count INTEGER NOT NULL,
+        average_ticket REAL NOT NULL,
+        PRIMARY KEY (restaurant_id, period, bucket)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS "rollup_watermark" (
+        name TEXT PRIMARY KEY,
+        last_order_id INTEGER NOT NULL
+    );
+"""
+
+WATERMARK_NAME = "revenue_rollup"
+
+# SQL expressions giving the first day of the bucket containing a date, and
+# the first day of the following bucket (weeks start on Monday). Days come
+# first: weeks and months are summed from the day buckets.
+PERIODS = {
+    "day": ("date({0})", "date({0}, '+1 day')"),
+    "week": ("date({0}, '-6 days', 'weekday 1')", "date({0}, '+7 days')"),
+    "month": ("date({0}, 'start of month')", "date({0}, '+1 month')"),
+}
+
+RevenueBucket = namedtuple(
+    "RevenueBucket",
+    ["restaurant_id", "period", "bucket", "revenue", "order_count", "average_ticket"],
+)
+RevenueTrend = namedtuple(
+    "RevenueTrend",
+    RevenueBucket._fields + ("moving_average", "revenue_delta", "revenue_delta_pct"),
+)
+
+
+def _changed_buckets_statement(period: str) -> str:
+    bucket_start = PERIODS[period][0].format('o.order_date')
+    return f"""
+        INSERT OR IGNORE INTO temp.changed_bucket (restaurant_id, period, bucket)
+        SELECT DISTINCT c.restaurant_id, '{period}', {bucket_start}
+        FROM "order" o
+        JOIN client c ON c.client_id = o.client_id
+        WHERE o.order_id > ?
+    """
+
+
+def _recompute_statement(period: str) -> str:
+    if period == "day":
+        # Each distinct changed day is read once from `order_order_date`, for
+        # all restaurants, and only the (restaurant, day) pairs that changed
+        # are kept. CROSS JOIN keeps this join order, so the cost follows the
+        # orders of the changed days rather than buckets x clients.
+        return """
+            INSERT OR REPLACE INTO revenue_rollup
+                (restaurant_id, period, bucket, revenue, order_count, average_ticket)
+            SELECT
+                c.restaurant_id,
+                'day',
+                b.bucket,
+                SUM(o.total_amount),
+                COUNT(o.order_id),
+                AVG(o.total_amount)
+            FROM (SELECT DISTINCT bucket FROM temp.changed_bucket WHERE period = 'day') b
+            CROSS JOIN "order" o
+            CROSS JOIN client c
+            WHERE o.order_date = b.bucket
+                AND c.client_id = o.client_id
+                AND (c.restaurant_id, 'day', b.bucket) IN (
+                    SELECT restaurant_id, period, bucket FROM temp.changed_bucket
+                )
+            GROUP BY c.restaurant_id, b.bucket
+        """
+
+    # Weeks and months are summed from the day buckets they contain (already
+    # recomputed), a primary key range of at most 31 rows per bucket
+    bucket_end = PERIODS[period][1].format("b.bucket")
+    return f"""
+        INSERT OR REPLACE INTO revenue_rollup
+            (restaurant_id, period, bucket, revenue, order_count, average_ticket)
+        SELECT
+            b.restaurant_id,
+            b.period,
+            b.bucket,
+            SUM(d.revenue),
+            SUM(d.order_count),
+            SUM(d.revenue) / SUM(d.order_count)
+        FROM temp.changed_bucket b
+        JOIN revenue_rollup d
+            ON d.restaurant_id = b.restaurant_id
+            AND d.period = 'day'
+            AND d.bucket >= b.bucket
+            AND d.bucket < {bucket_end}
+        WHERE b.period = '{period}'
+        GROUP BY b.restaurant_id, b.bucket
+    """
+
+
+def _rebuild_statement(period: str) -> str:
+    # Full rebuild: days in one grouped pass over the orders, then weeks and
+    # months in one grouped pass over the days
+    if period == "day":
+        return """
+            INSERT INTO revenue_rollup
+                (restaurant_id, period, bucket, revenue, order_count, average_ticket)
+            SELECT
+                c.restaurant_id,
+                'day',
+                date(o.order_date) AS bucket,
+                SUM(o.total_amount),
+                COUNT(o.order_id),
+                AVG(o.total_amount)
+            FROM "order" o
+            JOIN client c ON c.client_id = o.client_id
+            GROUP BY c.restaurant_id, bucket
+        """
+
+    bucket_start = PERIODS[period][0].format("d.bucket")
+    return f"""
+        INSERT INTO revenue_rollup
+            (restaurant_id, period, bucket, revenue, order_count, average_ticket)
+        SELECT
+            d.restaurant_id,
+            '{period}',
+            {bucket_start} AS period_bucket,
+            SUM(d.revenue),
+            SUM(d.order_count),
+            SUM(d.revenue) / SUM(d.order_count)
+        FROM revenue_rollup d
+        WHERE d.period = 'day'
+        GROUP BY d.restaurant_id, period_bucket
+    """
+
+
+# Fixed statements, built once so the connection's statement cache reuses them
+CHANGED_BUCKETS = {period: _changed_buckets_statement(period) for period in PERIODS}
+RECOMPUTE_BUCKETS = {period: _recompute_statement(period) for period in PERIODS}
+REBUILD_BUCKETS = {period: _rebuild_statement(period) for period in PERIODS}
+
+GET_BUCKET = """
+    SELECT restaurant_id, period, bucket, revenue, order_count, average_ticket
+    FROM revenue_rollup
+    WHERE restaurant_id = ? AND period = ? AND bucket = ?
+"""
+
+# SQL expressions numbering the buckets of a period consecutively, so window
+# frames and deltas count calendar buckets rather than stored rows
+BUCKET_INDEXES = {
+    "day": "CAST(julianday(bucket) AS INTEGER)",
+    "week": "CAST(julianday(bucket) AS INTEGER) / 7",
+    "month": "CAST(strftime('%Y', bucket) AS INTEGER) * 12 + CAST(strftime('%m', bucket) AS INTEGER)",
+}
+
+
+def _trends_statement(period: str) -> str:
+    # Buckets without orders have no row and count as zero revenue: the
+    # moving average sums the last `window` calendar buckets (fewer at the
+    # start of a series) and the delta compares with the previous calendar
+    # bucket, whose revenue is 0 if it is missing
+    return f"""
+        WITH series AS (
+            SELECT
+                restaurant_id,
+                period,
+                bucket,
+                revenue,
+                order_count,
+                average_ticket,
+                {BUCKET_INDEXES[period]} AS bucket_index
+            FROM revenue_rollup
+            WHERE period = '{period}' AND (:restaurant_id IS NULL OR restaurant_id = :restaurant_id)
+        ),
+        neighbours AS (
+            SELECT
+                *,
+                SUM(revenue) OVER (
+                    PARTITION BY restaurant_id ORDER BY bucket_index
+                    RANGE BETWEEN :preceding PRECEDING AND CURRENT ROW
+                ) AS window_revenue,
+                MIN(bucket_index) OVER (PARTITION BY restaurant_id) AS first_index,
+                CASE
+                    WHEN LAG(bucket_index) OVER previous = bucket_index - 1
+                    THEN LAG(revenue) OVER previous
+                    ELSE 0
+                END AS previous_revenue
+            FROM series
+            WINDOW previous AS (PARTITION BY restaurant_id ORDER BY bucket_index)
+        )
+        SELECT
+            restaurant_id,
+            period,
+            bucket,
+            revenue,
+            order_count,
+            average_ticket,
+            window_revenue / (MIN(:preceding, bucket_index - first_index) + 1),
+            CASE WHEN bucket_index > first_index THEN revenue - previous_revenue END,
+            100.0 * (revenue - previous_revenue) / NULLIF(previous_revenue, 0)
+        FROM neighbours
+        ORDER BY restaurant_id, bucket
+    """
+
+
+GET_TRENDS = {period: _trends_statement(period) for period in PERIODS}
+
+
+def ensure_rollup_tables(database_path: str = DATABASE_PATH):
+    """
+    Create the rollup tables and supporting indexes if they do not exist.
+
+    :param database_path: Path to the SQLite database file.
+    """
+    get_connection(database_path).executescript(ROLLUP_SCHEMA)
+
+
+def get_watermark(database_path: str = DATABASE_PATH) -> int:
+    """
+    Get the highest order_id already included in the rollups.
+
+    :param database_path: Path to the SQLite database file.
+    :return: The watermark, 0 if the rollups were never refreshed.
+    """
+    row = get_connection(database_path).execute(
+        "SELECT last_order_id FROM rollup_watermark WHERE name = ?", (WATERMARK_NAME,)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def _set_watermark(conn, last_order_id: int):
+    conn.execute(
+        "INSERT OR REPLACE INTO rollup_watermark (name, last_order_id) VALUES (?, ?)",
+        (WATERMARK_NAME, last_order_id),
+    )
+
+
+def refresh_rollups(database_path: str = DATABASE_PATH, full: bool = False) -> int:
+    """
+    Bring the rollups up to date with the `order` table.
+
+    Only buckets containing orders above the watermark are recomputed: the
+    orders of each changed day are read through the `order_order_date` index
+    of `up.sql`, and the changed weeks and months are summed from their days.
+    Then the watermark moves to the newest order.
+
+    :param database_path: Path to the SQLite database file.
+    :param full: Drop every rollup and rebuild them in one grouped pass over
+        the orders (days) and one over the days (weeks and months).
+    :return: The number of recomputed buckets.
+    """
+    ensure_rollup_tables(database_path)
+    conn = get_connection(database_path)
+
+    # Take the write lock before reading, like the group-commit writer: a
+    # deferred transaction that reads first cannot upgrade its lock while
+    # another writer is active and fails at once instead of waiting
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        last_order_id = conn.execute(
+            'SELECT COALESCE(MAX(order_id), 0) FROM "order"'
+        ).fetchone()[0]
+
+        if full:
+            conn.execute("DELETE FROM revenue_rollup")
+            for period in PERIODS:
+                conn.execute(REBUILD_BUCKETS[period])
+            changed = conn.execute("SELECT COUNT(*) FROM revenue_rollup").fetchone()[0]
+            _set_watermark(conn, last_order_id)
+            conn.commit()
+            print(f"Rebuilt {changed} revenue buckets up to order {last_order_id}.")
+            return changed
+
+        watermark = get_watermark(database_path)
+        if last_order_id <= watermark:
+            print(f"Revenue rollups are up to date (order {watermark}).")
+            conn.commit()
+            return 0
+
+        conn.execute(
+            """
+            CREATE TEMP TABLE IF NOT EXISTS changed_bucket (
+                restaurant_id INTEGER,
+                period TEXT,
+                bucket TEXT,
+                PRIMARY KEY (restaurant_id, period, bucket)
+            )
+            """
+        )
+        conn.execute("DELETE FROM temp.changed_bucket")
+        for period in PERIODS:
+            conn.execute(CHANGED_BUCKETS[period], (watermark,))
+        for period in PERIODS:
+            conn.execute(RECOMPUTE_BUCKETS[period])
+
+        changed = conn.execute("SELECT COUNT(*) FROM temp.changed_bucket").fetchone()[0]
+        _set_watermark(conn, last_order_id)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    print(f"Recomputed {changed} revenue buckets up to order {last_order_id}.")
+    return changed
+
+
+def schedule_refresh(database_path: str = DATABASE_PATH, interval: float = 300.0):
+    """
+    Run `refresh_rollups` every `interval` seconds until interrupted, so
+    orders written by the CRUD scripts or the writer daemon reach the
+    dashboard.
+
+    :param database_path: Path to the SQLite database file.
+    :param interval: Seconds between the start of two refreshes.
+    """
+    try:
+        while True:
+            start = time.monotonic()
+            refresh_rollups(database_path)
+            time.sleep(max(interval - (time.monotonic() - start), 0))
+    except KeyboardInterrupt:
+        pass
+
+
+def get_bucket(restaurant_id, period, bucket, database_path: str = DATABASE_PATH):
+    """
+    Read one rollup bucket.
+
+    :param restaurant_id: ID of the restaurant.
+    :param period: One of 'day', 'week' or 'month'.
+    :param bucket: First day of the bucket (YYYY-MM-DD).
+    :param database_path: Path to the SQLite database file.
+    :return: The `RevenueBucket`, or None if the restaurant had no orders then.
+    """
+    row = get_connection(database_path).execute(
+        GET_BUCKET, (restaurant_id, period, bucket)
+    ).fetchone()
+    return RevenueBucket._make(row) if row else None
+
+
+def get_trends(
+    period: str = "month",
+    restaurant_id=None,
+    window: int = 3,
+    database_path: str = DATABASE_PATH,
+) -> list:
+    """
+    Read the rollups of a period with moving averages and period-over-period deltas.
+
+    Both are taken over calendar buckets: a bucket without orders counts as
+    zero revenue, so a 3-day moving average always spans 3 days.
+
+    :param period: One of 'day', 'week' or 'month'.
+    :param restaurant_id: Only read this restaurant (optional).
+    :param window: Number of buckets in the moving average.
+    :param database_path: Path to the SQLite database file.
+    :return: List of `RevenueTrend` ordered by restaurant and bucket.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period '{period}', expected one of {list(PERIODS)}.")
+
+    rows = get_connection(database_path).execute(
+        GET_TRENDS[period],
+        {"preceding": max(window, 1) - 1, "restaurant_id": restaurant_id},
+    )
+    return [RevenueTrend._make(row) for row in rows]
@@ -0,0 +1,126 @@
+import os
+import sqlite3
+
+
+def database_path_from_url(database_url: str) -> str:
+    """
+    Get the database file path from an SQLite database URL.
+
+    :param database_url: SQLite database URL (e.g., sqlite:///restaurant.db).
+    :return: Path to the database file, or None for non-file URLs.
+    """
+    if database_url.startswith("sqlite:///"):
+        return database_url.replace("sqlite:///", "")
+    return None
+
+
+def database_exists(database_url: str) -> bool:
+    """
+    Check if the database file exists.
+
+    :param database_url: SQLite database URL.
+    :return: True if the database file exists, False otherwise.
+    """
+    db_file = database_path_from_url(database_url)
+    if db_file is not None:
+        return os.path.exists(db_file)
+    return False
+
+
+def apply_sql_script(
+    database_url: str,
+    script_path: str,
+    page_size: int = None,
+    auto_vacuum: str = "incremental",
+):
+    """
+    Applies an SQL script to initialize the database.
+
+    The page size and auto-vacuum mode only take effect on a new database,
+    before its first table is created.
+
+    :param database_url: SQLite database URL.
+    :param script_path: Path to the SQL script to execute.
+    :param page_size: Page size in bytes (power of two, 512-65536), or None
+        for SQLite's default.
+    :param auto_vacuum: "none", "full" or "incremental" (lets
+        `maintenance.incremental_vacuum` return free pages to the OS).
+    """
+    try:
+        with open(script_path, "r") as file:
+            sql_script = file.read()
+
+        with sqlite3.connect(database_path_from_url(database_url)) as connection:
+            if page_size:
+                connection.execute(f"PRAGMA page_size = {int(page_size)}")
+            if auto_vacuum:
+                connection.execute(f"PRAGMA auto_vacuum = {auto_vacuum}")
+            connection.executescript(sql_script)
+
+        print("Applied SQL script successfully.")
+    except Exception as e:
+        print(f"An error occurred while applying the SQL script: {e}")
+
+
+def index_statements(sql_script: str) -> list:
+    """
+    Extract the `CREATE INDEX` statements of an SQL script.
+
+    :param sql_script: Content of the SQL script.
+    :return: List of the index statements, in script order.
+    """
+    statements, current = [], ""
+    for line in sql_script.splitlines(keepends=True):
+        if not current.strip() and line.lstrip().startswith("--"):
+            continue
+        current += line
+        if sqlite3.complete_statement(current):
+            statements.append(current.strip())
+            current = ""
+    return [
+        statement for statement in statements
+        if statement.upper().startswith("CREATE INDEX")
+    ]
+
+
+def apply_indexes(database_url: str, script_path: str):
+    """
+    Create the indexes of the SQL script that an existing database lacks.
+
+    The indexes use `IF NOT EXISTS`, so existing ones are left untouched.
+
+    :param database_url: SQLite database URL.
+    :param script_path: Path to the SQL schema script.
+    """
+    try:
+        with open(script_path, "r") as file:
+            statements = index_statements(file.read())
+
+        with sqlite3.connect(database_path_from_url(database_url)) as connection:
+            connection.executescript("\n".join(statements))
+    except Exception as e:
+        print(f"An error occurred while creating the indexes: {e}")
+
+
+def initialize_database(
+    database_url: str,
+    up_script_path: str,
+    page_size: int = None,
+    auto_vacuum: str = "incremental",
+):
+    """
+    Initialize the database using the provided SQL script.
+
+    An existing database only gets the script's missing indexes.
+
+    :param database_url: SQLite database URL.
+    :param up_script_path: Path to the SQL schema script.
+    :param page_size: Page size in bytes, or None for SQLite's default.
+    :param auto_vacuum: "none", "full" or "incremental".
+    """
+    if not database_exists(database_url):
+        print("Database does not exist. Creating database and applying schema...")
+        apply_sql_script(database_url, up_script_path, page_size, auto_vacuum)
+    else:
+        print("Database already exists. Skipping schema creation.")
+        apply_indexes(database_url, up_script_path)
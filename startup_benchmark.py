@@ -0,0 +1,93 @@
+"""
+Cold-start report for the `resto` commands.
+
+Each command is started in a fresh interpreter with `python -X importtime`,
+importing exactly the modules the command's handler imports. The report
+shows the wall time of the fastest run, the time spent in imports and the
+heaviest top-level imports, next to a bare interpreter start for reference.
+"""
+import os
+import re
+import subprocess
+import sys
+import time
+
+# Format of a `-X importtime` line: "import time: <self> | <cumulative> | <indent><module>"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_importtime(stderr: str) -> list:
+    """
+    Parse the output of `python -X importtime` into top-level imports.
+
+    :param stderr: Standard error of the interpreter run.
+    :return: List of `(module, cumulative_us)` for imports made at top level.
+    """
+    imports = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) == 0:
+            imports.append((match.group(4), int(match.group(2))))
+    return imports
+
+
+def measure(code: str, repeat: int = 5) -> dict:
+    """
+    Run `code` in fresh interpreters and keep the fastest run.
+
+    :param code: Python source passed to `python -c`.
+    :param repeat: Number of cold starts.
+    :return: Dictionary with the wall time (ms), import time (ms) and the
+        top-level imports of the fastest run.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=PROJECT_DIR,
+            capture_output=True,
+            text=True,
+        )
+        wall_ms = (time.perf_counter() - start) * 1000
+
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()[-1]
+            return {"error": error}
+
+        if best is None or wall_ms < best["wall_ms"]:
+            imports = parse_importtime(result.stderr)
+            best = {
+                "wall_ms": wall_ms,
+                "import_ms": sum(us for _, us in imports) / 1000,
+                "imports": imports,
+            }
+    return best
+
+
+def report_startup(commands: list, repeat: int = 5, top: int = 5):
+    """
+    Print the cold-start time of each `resto` command.
+
+    :param commands: Names of the commands to measure.
+    :param repeat: Cold starts per command (the fastest is reported).
+    :param top: Number of heaviest top-level imports listed per command.
+    """
+    runs = [("(interpreter)", "pass"), ("(resto --help)", "import resto; resto.build_parser()")]
+    runs += [
+        (command, f"import resto; resto.import_command_modules({command!r})")
+        for command in commands
+    ]
+
+    print(f"{'command':<16}{'wall [ms]':>11}{'imports [ms]':>14}  slowest top-level imports")
+    for name, code in runs:
+        result = measure(code, repeat)
+        if "error" in result:
+            print(f"{name:<16}{'failed':>11}{'':>14}  {result['error']}")
+            continue
+
+        slowest = sorted(result["imports"], key=lambda item: item[1], reverse=True)[:top]
+        slowest = ", ".join(f"{module} {us / 1000:.1f}" for module, us in slowest)
+        print(f"{name:<16}{result['wall_ms']:>11.1f}{result['import_ms']:>14.1f}  {slowest}")
@@ -53,3 +53,12 @@ CREATE TABLE "supplier" (
     phone TEXT NOT NULL,
     address TEXT NOT NULL
 );
+
+-- Indexes backing the dashboard filters and the revenue rollups; also
+-- applied to existing databases by `schema.initialize_database`
+CREATE INDEX IF NOT EXISTS client_restaurant ON client (restaurant_id);
+CREATE INDEX IF NOT EXISTS order_order_date ON "order" (order_date);
+CREATE INDEX IF NOT EXISTS order_client_date ON "order" (client_id, order_date);
+CREATE INDEX IF NOT EXISTS delivery_restaurant_date ON delivery (restaurant_id, delivery_date);
+CREATE INDEX IF NOT EXISTS employee_restaurant_position ON employee (restaurant_id, position);
+CREATE INDEX IF NOT EXISTS dish_restaurant ON dish (restaurant_id);
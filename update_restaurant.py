@@ -1,52 +1,48 @@
-import sqlite3
 import sys
 
-def update_restaurant_by_id(restaurant_id, name=None, address=None):
+from repository import DATABASE_PATH, RestaurantRepository
+from write_queue import get_writer
+
+def update_restaurant_by_id(
+    restaurant_id, name=None, address=None, database_path=DATABASE_PATH
+):
     """
     Update the name and/or address of a restaurant by its ID.
 
     :param restaurant_id: The ID of the restaurant to update.
     :param name: The new name of the restaurant (optional).
     :param address: The new address of the restaurant (optional).
+    :param database_path: Path to the SQLite database file.
     """
     if name is None and address is None:
         print("Error: At least one of `name` or `address` must be provided to update.")
         return
 
-    conn = sqlite3.connect('restaurant.db')
-    cursor = conn.cursor()
-
-    # Generate the dynamic UPDATE statement based on provided fields
-    update_fields = []
-    params = []
-    if name:
-        update_fields.append("name = ?")
-        params.append(name)
-    if address:
-        update_fields.append("address = ?")
-        params.append(address)
-
-    # Add restaurant_id to params for the WHERE clause
-    params.append(restaurant_id)
-
-    # Combine the update fields into a single SQL statement
-    update_statement = f"""
-        UPDATE restaurant
-        SET {', '.join(update_fields)}
-        WHERE restaurant_id = ?
-    """
-
-    # Execute the UPDATE statement
-    cursor.execute(update_statement, params)
+    # Empty values keep the current column, as with omitted ones
+    updated = get_writer(RestaurantRepository, database_path).update(
+        restaurant_id, name=name or None, address=address or None
+    )
 
     # Provide feedback based on the operation
-    if cursor.rowcount > 0:
+    if updated > 0:
         print(f"Restaurant with ID {restaurant_id} updated successfully!")
     else:
         print(f"No restaurant found with ID {restaurant_id}.")
 
-    conn.commit()
-    conn.close()
+
+def update_restaurants_by_id(updates, database_path=DATABASE_PATH):
+    """
+    Update several restaurants in a single transaction.
+
+    :param updates: Iterable of `(restaurant_id, name, address)` tuples; a None
+        name or address keeps the current value.
+    :param database_path: Path to the SQLite database file.
+    """
+    updated = get_writer(RestaurantRepository, database_path).update_many(
+        (restaurant_id, {"name": name or None, "address": address or None})
+        for restaurant_id, name, address in updates
+    )
+    print(f"{updated} restaurants updated successfully!")
 
 
 # Handle command-line arguments
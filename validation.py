@@ -0,0 +1,219 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from repository import POSITIONS
+
+EMAIL_PATTERN = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+PHONE_PATTERN = r"^\+?[0-9(][0-9 .()-]{5,24}(\s*(x|ext\.?)\s*[0-9]+)?$"
+
+# Date formats accepted in the workbook: ISO first, then French day-first
+DATE_FORMATS = ("ISO8601", "%d/%m/%Y")
+
+# Column-level rules mirroring the constraints in `up.sql`. Foreign keys are
+# checked against the ids passed to `validate`, so unresolved names/emails
+# (mapped to NaN) are rejected instead of failing the NOT NULL constraint.
+TABLE_RULES = {
+    "restaurant": {
+        "columns": ["name", "address"],
+        "not_null": ["name", "address"],
+    },
+    "dish": {
+        "columns": ["restaurant_id", "name", "price"],
+        "not_null": ["name"],
+        "numeric": ["price"],
+        "foreign_keys": ["restaurant_id"],
+    },
+    "client": {
+        "columns": [
+            "restaurant_id",
+            "first_name",
+            "last_name",
+            "email",
+            "phone",
+            "inscription_date",
+        ],
+        "not_null": ["first_name", "last_name"],
+        "dates": ["inscription_date"],
+        "email": ["email"],
+        "phone": ["phone"],
+        "foreign_keys": ["restaurant_id"],
+    },
+    "order": {
+        "columns": ["client_id", "order_date", "total_amount"],
+        "numeric": ["total_amount"],
+        "dates": ["order_date"],
+        "foreign_keys": ["client_id"],
+    },
+    "employee": {
+        "columns": [
+            "restaurant_id",
+            "first_name",
+            "last_name",
+            "position",
+            "hiring_date",
+            "salary",
+        ],
+        "not_null": ["first_name", "last_name"],
+        "enums": {"position": POSITIONS},
+        "dates": ["hiring_date"],
+        "numeric": ["salary"],
+        "foreign_keys": ["restaurant_id"],
+    },
+    "delivery": {
+        "columns": ["restaurant_id", "product_name", "quantity", "delivery_date"],
+        "not_null": ["product_name"],
+        "integer": ["quantity"],
+        "dates": ["delivery_date"],
+        "foreign_keys": ["restaurant_id"],
+    },
+    "supplier": {
+        "columns": ["name", "email", "phone", "address"],
+        "not_null": ["name", "address"],
+        "email": ["email"],
+        "phone": ["phone"],
+    },
+}
+
+REJECT_COLUMNS = ["table", "sheet", "reason", "row"]
+
+
+def _matches(series: pd.Series, pattern: str) -> np.ndarray:
+    return series.astype("string").str.strip().str.fullmatch(pattern).fillna(False).to_numpy(bool)
+
+
+def _to_number(series: pd.Series) -> pd.Series:
+    # Amounts typed in the workbook may carry a currency sign or a decimal comma
+    if series.dtype == object or pd.api.types.is_string_dtype(series):
+        series = (
+            series.astype("string")
+            .str.replace(r"[€\s]", "", regex=True)
+            .str.replace(",", ".", regex=False)
+        )
+    return pd.to_numeric(series, errors="coerce")
+
+
+def _to_date(series: pd.Series) -> pd.Series:
+    # Each format is tried on the rows the previous ones could not parse, so
+    # a malformed value only fails its own row instead of the whole column
+    dates = pd.Series(pd.NaT, index=series.index, dtype="datetime64[ns]")
+    for date_format in DATE_FORMATS:
+        missing = dates.isna()
+        if not missing.any():
+            break
+        dates[missing] = pd.to_datetime(series[missing], format=date_format, errors="coerce")
+    return dates
+
+
+def validate(df: pd.DataFrame, table: str, foreign_keys: dict = None):
+    """
+    Check every rule for `table` on whole columns at once and split the rows.
+
+    Dates are normalized to `YYYY-MM-DD` text (as required by the
+    `CHECK(... IS date(...))` constraints) and numbers are coerced, so the
+    valid rows can be written without tripping any schema constraint.
+
+    :param df: DataFrame whose columns are already renamed to the schema names.
+    :param table: Name of the target table (a key of `TABLE_RULES`).
+    :param foreign_keys: Mapping of foreign key column to the ids it may reference.
+    :return: `(valid, rejected)`; `valid` holds only the table columns and
+        `rejected` holds the original rows plus a `reason` column.
+    :raises ValueError: If required columns are missing.
+    """
+    rules = TABLE_RULES[table]
+    columns = rules["columns"]
+
+    missing_cols = [col for col in columns if col not in df.columns]
+    if missing_cols:
+        raise ValueError(f"Missing columns: {missing_cols}")
+
+    clean = df[columns].copy()
+    failures = []
+
+    for col in rules.get("not_null", []):
+        blank = clean[col].isna() | (clean[col].astype("string").str.strip() == "")
+        failures.append((f"{col} is empty", blank.to_numpy(bool)))
+
+    for col in rules.get("numeric", []) + rules.get("integer", []):
+        values = _to_number(clean[col])
+        failures.append((f"{col} is not a number", values.isna().to_numpy(bool)))
+        clean[col] = values.astype(float)
+
+    for col in rules.get("integer", []):
+        values = clean[col].to_numpy(float)
+        fractional = ~np.isnan(values) & (np.floor(values) != values)
+        failures.append((f"{col} is not an integer", fractional))
+
+    for col in rules.get("dates", []):
+        values = _to_date(clean[col])
+        failures.append((f"{col} is not a valid date", values.isna().to_numpy()))
+        clean[col] = values.dt.strftime("%Y-%m-%d")
+
+    for col, allowed in rules.get("enums", {}).items():
+        unknown = ~clean[col].isin(allowed).to_numpy()
+        failures.append((f"{col} is not one of {', '.join(allowed)}", unknown))
+
+    for col in rules.get("email", []):
+        failures.append((f"{col} is not a valid email", ~_matches(clean[col], EMAIL_PATTERN)))
+
+    for col in rules.get("phone", []):
+        failures.append((f"{col} is not a valid phone number", ~_matches(clean[col], PHONE_PATTERN)))
+
+    for col in rules.get("foreign_keys", []):
+        known = np.asarray(list((foreign_keys or {}).get(col, [])), dtype=float)
+        values = pd.to_numeric(clean[col], errors="coerce").to_numpy(float)
+        failures.append((f"{col} does not resolve to an existing row", ~np.isin(values, known)))
+
+    reasons = np.full(len(clean), "", dtype=object)
+    for message, mask in failures:
+        reasons[mask] = reasons[mask] + message + "; "
+    bad = reasons != ""
+
+    rejected = df[bad].copy()
+    rejected["reason"] = [reason.rstrip("; ") for reason in reasons[bad]]
+    return clean[~bad], rejected
+
+
+def to_reject_records(rejected: pd.DataFrame, table: str, sheet: str) -> pd.DataFrame:
+    """
+    Convert rows returned by `validate` to the reject file layout.
+
+    :param rejected: Rejected rows including their `reason` column.
+    :param table: Name of the target table.
+    :param sheet: Name of the source sheet or file.
+    :return: DataFrame with the `REJECT_COLUMNS` columns.
+    """
+    if rejected.empty:
+        return pd.DataFrame(columns=REJECT_COLUMNS)
+
+    rows = rejected.drop(columns="reason").to_json(
+        orient="records", lines=True, date_format="iso", force_ascii=False
+    )
+    return pd.DataFrame(
+        {
+            "table": table,
+            "sheet": sheet,
+            "reason": rejected["reason"].to_numpy(),
+            "row": rows.splitlines(),
+        }
+    )
+
+
+def write_reject_file(rejects: list, reject_file_path: str):
+    """
+    Write all rejected rows of a run to a single CSV file.
+
+    :param rejects: List of DataFrames built by `to_reject_records`.
+    :param reject_file_path: Path of the reject file (overwritten on each run).
+    """
+    rejects = [frame for frame in rejects if not frame.empty]
+    if not rejects:
+        if os.path.exists(reject_file_path):
+            os.remove(reject_file_path)
+        print("No rows were rejected.")
+        return
+
+    all_rejects = pd.concat(rejects, ignore_index=True)
+    all_rejects.to_csv(reject_file_path, index=False)
+    print(f"Rejected {len(all_rejects)} rows, see '{reject_file_path}'.")
@@ -0,0 +1,363 @@
+"""
+Group-commit writer daemon for the SQLite database.
+
+SQLite allows a single writer at a time, so scripts writing concurrently
+fight over the lock. The daemon owns the only write connection: clients send
+write requests over a Unix socket, the writer thread merges the requests
+that arrive within `max_latency` seconds (up to `max_batch`) into a single
+transaction, and each client gets the result of its own request once the
+transaction is committed. A failing request is rolled back to its savepoint
+without affecting the rest of the group.
+
+Protocol: one JSON object per line in each direction.
+    request:  {"table": "restaurant", "op": "insert", "fields": {...}}
+              {"table": "restaurant", "op": "update", "id": 1, "fields": {...}}
+              {"table": "restaurant", "op": "delete", "id": 1}
+              (and insert_many/update_many/delete_many with "rows",
+              "updates" or "ids")
+              An optional "database" key holds the absolute path of the
+              database the client means to write to; the daemon refuses the
+              request if it serves another file.
+    response: {"ok": true, "result": <int>} or {"ok": false, "error": "..."}
+
+Set the `RESTO_WRITER_SOCKET` environment variable to make the CRUD scripts
+send their writes to a running daemon (see `get_writer`).
+"""
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+
+from repository import (
+    DATABASE_PATH,
+    ClientRepository,
+    DeliveryRepository,
+    DishRepository,
+    EmployeeRepository,
+    OrderRepository,
+    RestaurantRepository,
+    SupplierRepository,
+    get_connection,
+)
+
+SOCKET_PATH = "resto-writer.sock"
+WRITER_SOCKET_ENV = "RESTO_WRITER_SOCKET"
+
+REPOSITORIES = {
+    repo_class.table: repo_class
+    for repo_class in (
+        RestaurantRepository,
+        DishRepository,
+        ClientRepository,
+        OrderRepository,
+        EmployeeRepository,
+        DeliveryRepository,
+        SupplierRepository,
+    )
+}
+
+OPERATIONS = ("insert", "insert_many", "update", "update_many", "delete", "delete_many")
+
+
+class WriteRequest:
+    """A decoded write request waiting for its group commit."""
+
+    __slots__ = ("payload", "done", "response")
+
+    def __init__(self, payload: dict):
+        self.payload = payload
+        self.done = threading.Event()
+        self.response = None
+
+
+def apply_request(repositories: dict, payload: dict) -> int:
+    """
+    Run one write request through the matching repository.
+
+    :param repositories: Mapping of table name to repository instance.
+    :param payload: Decoded request (see the module docstring).
+    :return: The repository method's result (new id or affected row count).
+    :raises ValueError: If the table or operation is unknown.
+    """
+    repo = repositories.get(payload.get("table"))
+    op = payload.get("op")
+    if repo is None:
+        raise ValueError(f"Unknown table: {payload.get('table')}")
+    if op not in OPERATIONS:
+        raise ValueError(f"Unknown operation: {op}")
+
+    if op == "insert":
+        return repo.insert(**payload.get("fields", {}))
+    if op == "insert_many":
+        return repo.insert_many(payload["rows"])
+    if op == "update":
+        return repo.update(payload["id"], **payload.get("fields", {}))
+    if op == "update_many":
+        return repo.update_many(payload["updates"])
+    if op == "delete":
+        return repo.delete(payload["id"])
+    return repo.delete_many(payload["ids"])
+
+
+class GroupCommitWriter:
+    """
+    Writer thread applying queued requests in group commits.
+
+    :param database_path: Path to the SQLite database file.
+    :param max_batch: Maximum number of requests per transaction.
+    :param max_latency: Seconds to wait for more requests after the first
+        one of a group arrives.
+    """
+
+    def __init__(
+        self,
+        database_path: str = DATABASE_PATH,
+        max_batch: int = 256,
+        max_latency: float = 0.005,
+    ):
+        self.database_path = database_path
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.requests = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self.commits = 0
+        self.committed_requests = 0
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.requests.put(None)
+        self.thread.join()
+
+    def submit(self, payload: dict) -> dict:
+        """
+        Queue a request and wait until its group is committed.
+
+        :param payload: Decoded request.
+        :return: The response for this request.
+        """
+        database = payload.get("database")
+        if database is not None and os.path.realpath(database) != os.path.realpath(
+            self.database_path
+        ):
+            return {
+                "ok": False,
+                "error": f"Writer serves '{os.path.realpath(self.database_path)}', not '{database}'.",
+            }
+
+        request = WriteRequest(payload)
+        self.requests.put(request)
+        request.done.wait()
+        return request.response
+
+    def _next_group(self):
+        first = self.requests.get()
+        if first is None:
+            return None
+
+        group = [first]
+        deadline = time.monotonic() + self.max_latency
+        while len(group) < self.max_batch:
+            timeout = max(deadline - time.monotonic(), 0)
+            try:
+                request = self.requests.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                self.requests.put(None)
+                break
+            group.append(request)
+        return group
+
+    def _commit_group(self, conn, repositories, group):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for request in group:
+                conn.execute("SAVEPOINT request")
+                try:
+                    result = apply_request(repositories, request.payload)
+                    request.response = {"ok": True, "result": result}
+                except Exception as e:
+                    conn.execute("ROLLBACK TO request")
+                    request.response = {"ok": False, "error": str(e)}
+                conn.execute("RELEASE request")
+            conn.commit()
+            self.commits += 1
+            self.committed_requests += len(group)
+        except Exception as e:
+            conn.rollback()
+            for request in group:
+                request.response = {"ok": False, "error": f"Group commit failed: {e}"}
+
+    def _run(self):
+        conn = get_connection(self.database_path)
+        repositories = {
+            table: repo_class(self.database_path)
+            for table, repo_class in REPOSITORIES.items()
+        }
+
+        while True:
+            group = self._next_group()
+            if group is None:
+                break
+            self._commit_group(conn, repositories, group)
+            for request in group:
+                request.done.set()
+
+
+class _WriteHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                payload = json.loads(line)
+            except ValueError as e:
+                response = {"ok": False, "error": f"Invalid request: {e}"}
+            else:
+                response = self.server.writer.submit(payload)
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class WriteServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server forwarding every connection's requests to the writer."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, writer: GroupCommitWriter):
+        self.writer = writer
+        super().__init__(socket_path, _WriteHandler)
+
+
+def serve(
+    database_path: str = DATABASE_PATH,
+    socket_path: str = SOCKET_PATH,
+    max_batch: int = 256,
+    max_latency: float = 0.005,
+):
+    """
+    Run the writer daemon until interrupted.
+
+    :param database_path: Path to the SQLite database file.
+    :param socket_path: Path of the Unix socket to listen on.
+    :param max_batch: Maximum number of requests per transaction.
+    :param max_latency: Seconds to wait for more requests before committing.
+    """
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    writer = GroupCommitWriter(database_path, max_batch, max_latency)
+    writer.start()
+    server = WriteServer(socket_path, writer)
+    print(f"Writer daemon listening on '{socket_path}' for '{database_path}'.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        writer.stop()
+        os.remove(socket_path)
+        print(
+            f"Writer daemon stopped after {writer.committed_requests} requests "
+            f"in {writer.commits} commits."
+        )
+
+
+class WriteClient:
+    """
+    Connection to a running writer daemon.
+
+    :param socket_path: Path of the daemon's Unix socket.
+    """
+
+    def __init__(self, socket_path: str = SOCKET_PATH):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(socket_path)
+        self.file = self.sock.makefile("rwb")
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def send(self, payload: dict):
+        """
+        Send a write request and wait for its result.
+
+        :param payload: Request (see the module docstring).
+        :return: The result of the write.
+        :raises RuntimeError: If the daemon reports an error.
+        """
+        self.file.write(json.dumps(payload).encode() + b"\n")
+        self.file.flush()
+        response = json.loads(self.file.readline())
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+
+class RemoteRepository:
+    """
+    Write-only stand-in for a repository that sends writes to the daemon.
+
+    :param table: Name of the table.
+    :param socket_path: Path of the daemon's Unix socket.
+    :param database_path: Database the writes are meant for; the daemon
+        refuses them if it serves another file. None skips the check.
+    """
+
+    def __init__(self, table: str, socket_path: str = SOCKET_PATH, database_path: str = None):
+        self.table = table
+        self.socket_path = socket_path
+        self.database = os.path.abspath(database_path) if database_path else None
+
+    def _send(self, op: str, **payload):
+        if self.database:
+            payload["database"] = self.database
+        with WriteClient(self.socket_path) as client:
+            return client.send({"table": self.table, "op": op, **payload})
+
+    def insert(self, **fields) -> int:
+        return self._send("insert", fields=fields)
+
+    def insert_many(self, rows) -> int:
+        return self._send("insert_many", rows=list(rows))
+
+    def update(self, row_id, **fields) -> int:
+        return self._send("update", id=row_id, fields=fields)
+
+    def update_many(self, updates) -> int:
+        return self._send("update_many", updates=[list(update) for update in updates])
+
+    def delete(self, row_id) -> int:
+        return self._send("delete", id=row_id)
+
+    def delete_many(self, row_ids) -> int:
+        return self._send("delete_many", ids=list(row_ids))
+
+
+def get_writer(repo_class, database_path: str = DATABASE_PATH):
+    """
+    Get the object writes to a table should go through.
+
+    :param repo_class: Repository class of the table (e.g. `RestaurantRepository`).
+    :param database_path: Path to the SQLite database file.
+    :return: A `RemoteRepository` if `RESTO_WRITER_SOCKET` names a socket
+        (its writes fail unless the daemon serves `database_path`),
+        otherwise a local repository writing to the file directly.
+    """
+    socket_path = os.environ.get(WRITER_SOCKET_ENV)
+    if socket_path:
+        return RemoteRepository(repo_class.table, socket_path, database_path)
+    return repo_class(database_path)